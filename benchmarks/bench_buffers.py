@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""\
+Compare output buffer backends of :class:`~htmlwriter.XMLWriter`.
+
+    python benchmarks/bench_buffers.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from htmlwriter import HTML5Writer, StringIOBuffer, ListBuffer, BytesBuffer
+
+
+BUFFERS = (StringIOBuffer, ListBuffer, BytesBuffer)
+SIZES = (
+    ('small', 10),
+    ('medium', 1000),
+    ('huge', 100000),
+)
+
+
+def render(buffer_class, rows):
+    h = HTML5Writer(lang='en')
+    h.buffer = buffer_class()
+    with h.body, h.table:
+        for i in range(rows):
+            with h.tr:
+                h.td(i)
+                h.td('row <%d>' % (i, ), class_='name')
+    return h.getvalue()
+
+
+def main():
+    print('%-8s %8s  %s' % ('size', 'rows', '  '.join('%16s' % (i.__name__, ) for i in BUFFERS)))
+
+    for name, rows in SIZES:
+        number = max(1, 10000 // rows)
+        results = []
+        for buffer_class in BUFFERS:
+            seconds = min(timeit.repeat(lambda: render(buffer_class, rows), number=number, repeat=3)) / number
+            results.append('%14.3fms' % (seconds * 1000, ))
+        print('%-8s %8d  %s' % (name, rows, '  '.join(results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""\
+Compare :func:`~htmlwriter.escape_text` with former implementation of :meth:`~htmlwriter.XMLWriter.text`.
+
+    python benchmarks/bench_escape.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from htmlwriter import escape_text, escape_texts
+
+
+def legacy_escape_text(s):
+    mapping = {
+        '&': '&amp;',
+        '>': '&gt;',
+        '<': '&lt;',
+    }
+    return re.sub('&(?!#[0-9]{1,4};|[A-Za-z]+;)|<|>', lambda m: mapping[m.group(0)], s)
+
+
+SAMPLES = (
+    ('plain', 'Lorem ipsum dolor sit amet, consectetur adipiscing elit'),
+    ('few', 'Tom & Jerry <cartoon> &copy; 1940'),
+    ('many', '<a href="?x=1&y=2">&lt;</a>' * 20),
+)
+
+
+def main():
+    number = 20000
+
+    print('%-8s %14s %14s %8s' % ('sample', 'legacy', 'escape_text', 'ratio'))
+    for name, sample in SAMPLES:
+        assert legacy_escape_text(sample) == escape_text(sample)
+        legacy = min(timeit.repeat(lambda: legacy_escape_text(sample), number=number, repeat=5)) / number
+        current = min(timeit.repeat(lambda: escape_text(sample), number=number, repeat=5)) / number
+        print('%-8s %12.3fus %12.3fus %7.1fx' % (name, legacy * 1e6, current * 1e6, legacy / current))
+
+    values = [sample for _, sample in SAMPLES] * 100
+    assert escape_texts(values) == [legacy_escape_text(i) for i in values]
+    number = 200
+    legacy = min(timeit.repeat(lambda: [legacy_escape_text(i) for i in values], number=number, repeat=5)) / number
+    single = min(timeit.repeat(lambda: [escape_text(i) for i in values], number=number, repeat=5)) / number
+    batch = min(timeit.repeat(lambda: escape_texts(values), number=number, repeat=5)) / number
+    print('batch of %d values: legacy %.3fms, escape_text %.3fms, escape_texts %.3fms' % (
+        len(values), legacy * 1e3, single * 1e3, batch * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""\
+Measure import time of :mod:`htmlwriter` and cost of compiling templates, each in fresh interpreter. Cases are
+measured without template cache, with cold (empty) and warm template cache (see `HTMLWRITER_CACHE_DIR`).
+
+    python benchmarks/bench_import.py
+"""
+import os
+import shutil
+import subprocess
+import sys
+import statistics
+import tempfile
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+CASES = (
+    ('import', ''),
+    ('import + compile all', '''
+for klass in (htmlwriter.HTMLWriter, htmlwriter.XHTMLWriter, htmlwriter.HTML5Writer, htmlwriter.Bootstrap3Writer):
+    htmlwriter.PreProcessor.compile_class(klass)
+'''),
+    ('import + HTML5Writer', '''
+h = htmlwriter.HTML5Writer()
+h.p('hello, world')
+h.getvalue()
+'''),
+    ('import + Bootstrap3Writer', '''
+h = htmlwriter.Bootstrap3Writer()
+h.bs_menuitem('hello, world')
+h.getvalue()
+'''),
+)
+
+SCRIPT = '''
+import time, warnings
+warnings.simplefilter('ignore')
+start = time.perf_counter()
+import htmlwriter
+%s
+print(time.perf_counter() - start)
+'''
+
+
+def measure(code, cache=None, repeat=30):
+    """
+    :param str code: code executed after import
+    :param str cache: `None` (no cache), `'cold'` or `'warm'`
+    :param int repeat: count of processes
+    :return: median seconds
+    """
+    results = []
+    env = dict(os.environ)
+    env.pop('HTMLWRITER_CACHE_DIR', None)
+    cache_dir = tempfile.mkdtemp()
+
+    try:
+        for _ in range(repeat):
+            if cache:
+                env['HTMLWRITER_CACHE_DIR'] = cache_dir
+            if cache == 'cold':
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            elif cache == 'warm' and not os.listdir(cache_dir):
+                subprocess.check_call([sys.executable, '-c', SCRIPT % (code, )], cwd=ROOT, env=env,
+                                      stdout=subprocess.DEVNULL)
+
+            output = subprocess.check_output([sys.executable, '-c', SCRIPT % (code, )], cwd=ROOT, env=env)
+            results.append(float(output))
+
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return statistics.median(results)
+
+
+def main():
+    print('%-28s %10s %10s %10s' % ('', 'no cache', 'cold', 'warm'))
+    for name, code in CASES:
+        print('%-28s %8.2fms %8.2fms %8.2fms' % (
+            name, measure(code) * 1000, measure(code, 'cold') * 1000, measure(code, 'warm') * 1000))
+
+
+if __name__ == '__main__':
+    main()
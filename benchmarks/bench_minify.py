@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""\
+Compare output size and throughput of compact, minify (:attr:`~htmlwriter.XMLWriter.minify`) and pretty printing
+(:attr:`~htmlwriter.XMLWriter.indent`) modes on Bootstrap pages.
+
+    python benchmarks/bench_minify.py
+"""
+import os
+import sys
+import timeit
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from htmlwriter import Bootstrap3Writer
+
+
+MODES = (
+    ('compact', {}),
+    ('minify', {'minify': True}),
+    ('pretty', {'indent': '  '}),
+)
+
+
+def render_page(h, rows=50):
+    """Write a typical Bootstrap page: navbar, table, dropdown menu, form and modal dialog."""
+    with h.head:
+        h.meta(charset='utf-8')
+        h.title('Dashboard')
+        h.link(rel='stylesheet', href='/static/css/bootstrap.min.css')
+
+    with h.body:
+        with h.bs_navbar('Brand', id='navbar', href='/'), h.bs_nav_pills:
+            for i in range(5):
+                h.bs_menuitem('Menu %d' % (i, ), href='/menu/%d' % (i, ), active=i == 0)
+
+        with h.bs_container, h.bs_row:
+            with h.table(class_='table table-striped'):
+                with h.thead, h.tr:
+                    for name in ('#', 'Name', 'Status', 'Updated'):
+                        h.th(name)
+                with h.tbody:
+                    for i in range(rows):
+                        with h.tr(class_='active' if i % 5 == 0 else 'default'):
+                            h.td(i)
+                            h.td('Item <%d>' % (i, ))
+                            with h.td:
+                                h.bs_label_info('new', id='label%d' % (i, ))
+                            h.td('2015-01-%02d' % (i % 28 + 1, ))
+
+            with h.bs_dropdown_menu():
+                for i in range(10):
+                    h.bs_menuitem('Link %d' % (i, ), href='/link/%d' % (i, ), disabled=i == 9)
+
+            with h.form(action='/search', method='get'):
+                h.input(type='text', name='q', class_='form-control', placeholder='Search', required=True)
+                with h.select(name='sort', class_='form-control'):
+                    for name in ('name', 'status', 'updated'):
+                        h.option(name, value=name, selected=name == 'name')
+                h.bs_btn_primary('Search', type='submit')
+
+            with h.bs_modal_dialog(id='modal', aria_labelledby='label'):
+                with h.bs_modal_header:
+                    h.bs_modal_close_icon('Close')
+                    h.h4('Title', class_='modal-title', id='label')
+                h.bs_modal_body('...')
+                with h.bs_modal_footer:
+                    h.bs_modal_close_button('Close')
+                    h.bs_btn_primary('Save changes')
+
+
+def render(attributes):
+    h = Bootstrap3Writer(lang='en')
+    h.__dict__.update(attributes)
+    render_page(h)
+    return h.getvalue()
+
+
+def main():
+    number = 100
+
+    print('%-8s %10s %10s %12s' % ('mode', 'size', 'gzip', 'time'))
+    for name, attributes in MODES:
+        content = render(attributes).encode('utf-8')
+        seconds = min(timeit.repeat(lambda: render(attributes), number=number, repeat=5)) / number
+        print('%-8s %10d %10d %10.3fms' % (name, len(content), len(zlib.compress(content, 6)), seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
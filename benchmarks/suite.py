@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""\
+Benchmark suite of writer hot paths.
+
+    python benchmarks/suite.py                      # run and compare with benchmarks/baseline.json
+    python benchmarks/suite.py --save               # run and store results as benchmarks/baseline.json
+    python benchmarks/suite.py -k bs_ --threshold 0.5
+
+Result is seconds per call (best of repeats). A benchmark slower than baseline by more than threshold is reported as
+regression, and exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+sys.path.insert(0, HERE)
+
+import htmlwriter
+from htmlwriter import XMLWriter, HTML5Writer, Bootstrap3Writer
+from bench_minify import render_page
+
+
+BASELINE = os.path.join(HERE, 'baseline.json')
+#: `[(name, function, number)]`
+BENCHMARKS = []
+
+
+def benchmark(number):
+    """Register benchmark function.
+
+    :param int number: count of calls in one measurement
+    """
+    def decorator(function):
+        BENCHMARKS.append((function.__name__, function, number))
+        return function
+    return decorator
+
+
+@benchmark(number=200)
+def tag_throughput():
+    h = XMLWriter('root')
+    for i in range(100):
+        with h.tag('item'):
+            h.tag('name', 'value')
+            h.tag('empty')
+    return h.getvalue()
+
+
+@benchmark(number=200)
+def text_throughput():
+    h = HTML5Writer()
+    for i in range(100):
+        h.text('plain text without markup')
+        h.text('Tom & Jerry <cartoon> &copy;')
+    return h.getvalue()
+
+
+@benchmark(number=200)
+def attribute_heavy_tags():
+    h = HTML5Writer()
+    for i in range(50):
+        h.input(type='checkbox', name='item%d' % (i, ), class_=['a', 'b'], data_id=i, data_role='row',
+                aria_label='item "%d"' % (i, ), checked=bool(i % 2), disabled=False, required=True)
+    return h.getvalue()
+
+
+@benchmark(number=200)
+def shallow_template_methods():
+    h = Bootstrap3Writer()
+    with h.bs_container, h.bs_row:
+        for i in range(50):
+            with h.bs_panel_body():
+                h.bs_btn_primary('Save')
+                h.bs_label_info('new', id='label%d' % (i, ))
+    return h.getvalue()
+
+
+@benchmark(number=100)
+def bs_menuitem():
+    h = Bootstrap3Writer()
+    with h.bs_dropdown_menu():
+        for i in range(100):
+            h.bs_menuitem('Item %d' % (i, ), href='/item/%d' % (i, ), active=i == 3, disabled=i == 5)
+    return h.getvalue()
+
+
+@benchmark(number=500)
+def bs_modal_dialog():
+    h = Bootstrap3Writer()
+    with h.bs_modal_dialog(id='modal', aria_labelledby='label'):
+        with h.bs_modal_header:
+            h.bs_modal_close_icon('Close')
+            h.h4('Title', class_='modal-title', id='label')
+        h.bs_modal_body('...')
+        with h.bs_modal_footer:
+            h.bs_modal_close_button('Close')
+            h.bs_btn_primary('Save changes')
+    return h.getvalue()
+
+
+@benchmark(number=500)
+def bs_navbar():
+    h = Bootstrap3Writer()
+    with h.bs_navbar('Brand', id='navbar', href='/'), h.bs_nav_pills:
+        for i in range(5):
+            h.bs_menuitem('Item %d' % (i, ), href='/%d' % (i, ))
+    return h.getvalue()
+
+
+@benchmark(number=50)
+def bs_page():
+    h = Bootstrap3Writer(lang='en')
+    render_page(h)
+    return h.getvalue()
+
+
+@benchmark(number=50)
+def bs_page_minify():
+    h = Bootstrap3Writer(lang='en')
+    h.minify = True
+    render_page(h)
+    return h.getvalue()
+
+
+@benchmark(number=5)
+def large_table():
+    h = HTML5Writer()
+    with h.table, h.tbody:
+        for i in range(1000):
+            with h.tr(class_='odd' if i % 2 else 'even'):
+                for j in range(10):
+                    h.td('%d:%d' % (i, j))
+    return h.getvalue()
+
+
+@benchmark(number=20)
+def scriptdata_big_payload():
+    h = HTML5Writer()
+    with h.head:
+        h.scriptdata(payload=[{'id': i, 'name': '</script> %d' % (i, ), 'tags': ['a', 'b']} for i in range(5000)])
+    return h.getvalue()
+
+
+_document = None
+
+
+@benchmark(number=10)
+def getvalue_multi_mb():
+    global _document
+    if _document is None:
+        _document = HTML5Writer()
+        with _document.body:
+            for i in range(50000):
+                _document.p('paragraph %d' % (i, ), class_='text')
+    return _document.getvalue()
+
+
+@benchmark(number=1)
+def import_time():
+    import bench_import
+    return bench_import.measure('', repeat=5)
+
+
+def run(pattern=None, repeat=5):
+    """Run benchmarks.
+
+    :param str pattern: substring of benchmark name or `None`
+    :param int repeat: count of measurements, best one is used
+    :return: `{name: seconds_per_call}`
+    :rtype: dict
+    """
+    results = {}
+
+    for name, function, number in BENCHMARKS:
+        if pattern and pattern not in name:
+            continue
+
+        if name == 'import_time':
+            results[name] = function()  # measured in subprocess
+        else:
+            function()  # warming up (compiling templates, etc.)
+            results[name] = min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+        print('%-28s %12.3fms' % (name, results[name] * 1000), flush=True)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Compare results with baseline.
+
+    :param dict results: current results
+    :param dict baseline: baseline results
+    :param float threshold: allowed slowdown ratio (ex. 0.2 means 20%)
+    :return: list of regressed benchmark names
+    :rtype: list
+    """
+    regressions = []
+
+    for name, seconds in sorted(results.items()):
+        if name not in baseline:
+            continue
+        ratio = seconds / baseline[name] - 1
+        flag = ''
+        if ratio > threshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        print('%-28s %+8.1f%% %s' % (name, ratio * 100, flag))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='pattern', help='run benchmarks which name contains this')
+    parser.add_argument('--repeat', type=int, default=5, help='count of measurements (default: %(default)s)')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline file (default: %(default)s)')
+    parser.add_argument('--save', action='store_true', help='store results as baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown ratio before reporting regression (default: %(default)s)')
+    args = parser.parse_args()
+
+    results = run(args.pattern, args.repeat)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'htmlwriter': htmlwriter.__version__,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+            f.write('\n')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('no baseline: %s' % (args.baseline, ))
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    print()
+    print('compared with baseline (python %s, %s)' % (baseline['python'], baseline['platform']))
+    return 1 if compare(results, baseline['results'], args.threshold) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,12 +18,14 @@ from os.path import commonprefix
 import textwrap
 import contextlib
 import functools
-import collections
+import collections.abc
 # from lxml import etree  # lxml doesn't support customizing entity handler
 from xml.etree import ElementTree as etree
-import xml.sax.saxutils  # or html.escape
 import json
 import unittest
+import threading
+import os
+import time
 
 
 __version__ = '1.0.0'
@@ -66,24 +68,606 @@ xhtml_1_0_frameset = '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Frameset//EN"
 xhtml_1_1 = '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.1//EN" "http://www.w3.org/TR/xhtml11/DTD/xhtml11.dtd">'
 
 
-def parse_xml(data):
-    data = re.sub('&([A-Za-z0-9]+);', '&amp;\\1;', data)
+@functools.lru_cache(maxsize=1)
+def _get_entity_table() -> dict:
+    # `{name: numeric character references}` of HTML entities (ex. `{'nbsp': '&#160;'}`)
+    import html.entities  # NOTE: import on demand
 
-    # In Python 3, it's unable to override `xml.etree.ElementTree.XMLParser` expat handler.
-    parser = etree.XMLParser()
-    parser.entity['amp'] = '&'
-    # parser.entity.update(html.entities.html5)
+    return {
+        name[:-1]: ''.join('&#%d;' % (ord(c), ) for c in value)
+        for name, value in html.entities.html5.items()
+        if name.endswith(';')
+    }
+
+
+def _iter_xml_chunks(source, chunk_size: int):
+    # `str`, `bytes`, file object or iterable of chunks -> iterator of chunks
+    if isinstance(source, (str, bytes)):
+        for i in range(0, len(source), chunk_size):
+            yield source[i:i + chunk_size]
+
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    else:
+        yield from source
+
+
+#: Pattern of entity reference that isn't predefined in XML.
+_html_reference = '&(?!(?:amp|lt|gt|quot|apos);)([A-Za-z][A-Za-z0-9]*);'
+#: Substitute functions of :data:`~_html_reference` for `str` and `bytes`.
+_sub_html_reference = re.compile(_html_reference).sub
+_sub_html_reference_bytes = re.compile(_html_reference.encode('ascii')).sub
+#: Maximum length of HTML entity reference that is carried over to next chunk.
+_html_reference_maxsize = 40
+#: Replacement of '&' of HTML entity reference in parsed template, this distinguishes '&nbsp;' from '&amp;nbsp;'.
+_template_reference = '\ue000'
+
+
+def _replace_html_references(chunks, resolve: bool=False):
+    # Replace HTML entity references (undefined in XML) in text and attribute values with '&amp;name;' (kept as
+    # text by parser) or numeric character references if `resolve`. Unknown references are always kept.
+    # Incomplete reference at the end of chunk is carried over to next chunk.
+    if resolve:
+        table = _get_entity_table()
+
+        def replace(m):
+            return table.get(m.group(1), '&amp;' + m.group(1) + ';')
+
+        def replace_bytes(m):
+            name = m.group(1).decode('ascii')
+            return table.get(name, '&amp;' + name + ';').encode('ascii')
+
+    else:
+        replace = '&amp;\\1;'
+        replace_bytes = b'&amp;\\1;'
+
+    rest = None
+    for chunk in chunks:
+        if rest:
+            chunk = rest + chunk
+
+        if isinstance(chunk, str):
+            i = chunk.rfind('&', -_html_reference_maxsize)
+            if i >= 0 and ';' not in chunk[i:]:
+                chunk, rest = chunk[:i], chunk[i:]
+            else:
+                rest = None
+            if '&' in chunk:
+                chunk = _sub_html_reference(replace, chunk)
+
+        else:
+            i = chunk.rfind(b'&', -_html_reference_maxsize)
+            if i >= 0 and b';' not in chunk[i:]:
+                chunk, rest = chunk[:i], chunk[i:]
+            else:
+                rest = None
+            if b'&' in chunk:
+                chunk = _sub_html_reference_bytes(replace_bytes, chunk)
+
+        if chunk:
+            yield chunk
+
+    if rest:
+        yield rest
 
-    parser.feed(data)
+
+def parse_xml(source, *, resolve_entities: bool=False, chunk_size: int=65536) -> etree.Element:
+    """Parse XML with HTML entities. Source is fed to parser by chunks.
+
+    HTML entity references (ex. '&nbsp;') in text and attribute values are kept as is, or resolved to characters if
+    `resolve_entities`. Unknown entity references are kept as is.
+
+    :param source: XML as `str`, `bytes`, file object or iterable of chunks
+    :param bool resolve_entities: resolve HTML entity references
+    :param int chunk_size: size of reading from `source`
+    :return: root element
+    :rtype: Element
+    """
+    parser = etree.XMLParser()
+    for chunk in _replace_html_references(_iter_xml_chunks(source, chunk_size), resolve_entities):
+        parser.feed(chunk)
     return parser.close()
 
 
+def iterparse_xml(source, events=('end', ), *, resolve_entities: bool=False, chunk_size: int=65536):
+    """Parse XML incrementally like :func:`xml.etree.ElementTree.iterparse`, and handle HTML entities like
+    :func:`~htmlwriter.parse_xml`.
+
+    Memory usage is proportional to `chunk_size`, if handled elements are cleared:
+
+        >>> for event, e in iterparse_xml(open('large.html', 'rb')):
+        ...     if e.tag == 'tr':
+        ...         handle(e)
+        ...         e.clear()
+
+    :param source: XML as `str`, `bytes`, file object or iterable of chunks
+    :param events: events to report, see :class:`xml.etree.ElementTree.XMLPullParser`
+    :param bool resolve_entities: resolve HTML entity references
+    :param int chunk_size: size of reading from `source`
+    :return: iterator of `(event, element)`
+    """
+    parser = etree.XMLPullParser(events)
+    for chunk in _replace_html_references(_iter_xml_chunks(source, chunk_size), resolve_entities):
+        parser.feed(chunk)
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+#: Substitute function of whitespace sequence, used for template text in pretty printing.
+_collapse_whitespace = re.compile('\\s+').sub
+#: Search function of a character that requires quotes in attribute value of HTML, trailing '/' is quoted to avoid
+#: confusion with self-closing tag.
+_unsafe_unquoted_attribute = re.compile('[\\s"\'=<>`]|/$').search
+#: Substitute function of '&' that isn't a part of character or entity reference.
+_escape_ampersand = re.compile('&(?!#[0-9]{1,4};|[A-Za-z]+;)').sub
+#: Search function of a character that requires escaping or alternative quotes in attribute value.
+_attribute_special = re.compile('[&<>"\n\r\t]').search
+#: Substitute function of a character that requires escaping in attribute value.
+_escape_attribute = re.compile('[&<>\n\r\t]').sub
+_attribute_entities = {
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '\n': '&#10;',
+    '\r': '&#13;',
+    '\t': '&#9;',
+}
+
+
+def escape_text(s: str) -> str:
+    """Escape '&', '<' and '>' in text. '&' of character or entity reference (ex. '&amp;', '&#123;') is kept.
+
+        >>> escape_text('a < b &amp; c & d')
+        'a &lt; b &amp; c &amp; d'
+
+    :param str s: text
+    :return: escaped text
+    :rtype: str
+    """
+    if '&' in s:
+        s = _escape_ampersand('&amp;', s)
+    return s.replace('<', '&lt;').replace('>', '&gt;')
+
+
+def escape_texts(values) -> list:
+    """Batch version of :func:`~htmlwriter.escape_text`. Values are escaped at once.
+
+        >>> escape_texts(['<a>', 1, '&b'])
+        ['&lt;a&gt;', '1', '&amp;b']
+
+    :param values: iterable of text, not `str` item will be converted by `str`
+    :return: list of escaped text
+    :rtype: list(str)
+    """
+    values = [i if isinstance(i, str) else str(i) for i in values]
+    result = escape_text('\0'.join(values)).split('\0')
+    if len(result) != len(values):  # some values contain separator
+        result = [escape_text(i) for i in values]
+    return result
+
+
+def quote_attribute(s: str) -> str:
+    """Escape and quote attribute value, result is same as :func:`xml.sax.saxutils.quoteattr`.
+
+        >>> quote_attribute('a < "b"')
+        '\'a &lt; "b"\''
+
+    :param str s: attribute value
+    :return: quoted attribute value
+    :rtype: str
+    """
+    if not _attribute_special(s):
+        return '"' + s + '"'
+
+    s = _escape_attribute(lambda m: _attribute_entities[m.group(0)], s)
+    if '"' in s:
+        if "'" not in s:
+            return "'" + s + "'"
+        s = s.replace('"', '&quot;')
+    return '"' + s + '"'
+
+
+def _escape_template_text(s: str) -> str:
+    # Escape text of template parsed by :meth:`PreProcessor.compile_entries`. Unlike :func:`escape_text`, '&' is
+    # always escaped, only HTML entity references of template source are kept.
+    s = s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return s.replace(_template_reference, '&')
+
+
+class TagProfile:
+    """Behavior of a tag folded from :attr:`~htmlwriter.XMLWriter._no_end_tags`,
+    :attr:`~htmlwriter.XMLWriter._require_end_tags`, :attr:`~htmlwriter.XMLWriter._boolean_attributes` and
+    :attr:`~htmlwriter.XMLWriter._merge_attribute_handlers` of a class, see
+    :meth:`~htmlwriter.XMLWriter._get_tag_profile`.
+    """
+    __slots__ = ('tag', 'void', 'empty_end_tag', 'end_tag', 'boolean_attributes', 'merge_handlers')
+
+    def __init__(self, writer_class, tag: str):
+        """
+        :param XMLWriter writer_class: writer class
+        :param str tag: tag name
+        """
+        require_end_tags = writer_class._require_end_tags
+
+        self.tag = tag
+        #: Tag cannot contain content and has no end tag (ex. `<br>`).
+        self.void = tag in writer_class._no_end_tags
+        #: Closing string of begin tag of empty element, `'>'`, `'></tag>'` or `'/>'`.
+        if self.void:
+            self.empty_end_tag = '>'
+        elif require_end_tags is True or tag in require_end_tags:
+            self.empty_end_tag = '></%s>' % (tag, )
+        else:
+            self.empty_end_tag = '/>'
+        self.end_tag = '</%s>' % (tag, )
+        #: Set of boolean attribute name.
+        self.boolean_attributes = frozenset(
+            name for tag_, name in writer_class._boolean_attributes if tag_ is None or tag_ == tag)
+        #: Merge handlers, `{attribute_name: handler(old_value, new_value)}`. Handler for the tag is prior.
+        self.merge_handlers = {
+            name: handler for (tag_, name), handler in writer_class._merge_attribute_handlers.items() if tag_ is None}
+        self.merge_handlers.update(
+            (name, handler) for (tag_, name), handler in writer_class._merge_attribute_handlers.items() if tag_ == tag)
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self.tag)
+
+
+class ElementContext:
+    """Context manager of element, this is returned by :meth:`~htmlwriter.XMLWriter._element`.
+
+    Begin tag is written on enter, end tag is written on exit.
+    """
+    __slots__ = ('writer', 'tag', 'begin_tag', 'content')
+
+    def __init__(self, writer, tag: str, begin_tag: str, content=None):
+        self.writer = writer
+        self.tag = tag
+        self.begin_tag = begin_tag
+        self.content = content
+
+    def __enter__(self):
+        writer = self.writer
+        if writer.minify or writer.indent is not None:
+            writer._layout_enter(self.tag)
+        # '>' of begin tag is deferred until first writing of content or end of tag
+        writer.write(self.begin_tag[:-1])
+        writer._deferred = '>'
+        if self.content:
+            writer.text(self.content)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            return
+
+        writer = self.writer
+        tag = self.tag
+        if writer.minify or writer.indent is not None:
+            writer._layout_exit(tag)
+            if writer.minify and tag in writer._optional_end_tags:
+                writer._hold_end_tag(tag)
+                return
+
+        profile = writer._tag_profiles.get(tag) or writer._get_tag_profile(tag)
+        if writer._deferred and writer._pending is None:
+            writer._deferred = None
+            writer.write(profile.empty_end_tag)
+        else:
+            assert not profile.void, '"%s" tag cannot contain content' % (tag, )
+            writer.write(profile.end_tag)
+
+
+class PendingContext:
+    """Context manager of method call, this is returned by :class:`~htmlwriter.TagMethodHelper` and registered as
+    :attr:`~htmlwriter.XMLWriter._pending`.
+
+    Method is called on enter, so it will be executed in `with statement` or next
+    :meth:`~htmlwriter.XMLWriter.write`.
+    """
+    __slots__ = ('writer', 'method', 'args', 'kwargs', 'context_manager')
+
+    def __init__(self, writer, method, args: tuple, kwargs: dict):
+        self.writer = writer
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.context_manager = None
+
+    def __enter__(self):
+        writer = self.writer
+        assert writer._pending is self, '%s' % (writer._pending, )
+        writer._pending = None
+        self.context_manager = self.method(*self.args, **self.kwargs)
+        return self.context_manager.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.context_manager.__exit__(exc_type, exc_value, traceback)
+
+
+class ProfileElementContext(ElementContext):
+    """:class:`~htmlwriter.ElementContext` that reports to :attr:`~htmlwriter.XMLWriter.profiler` on exit."""
+    __slots__ = ('start', 'position')
+
+    def __enter__(self):
+        self.position = self.writer._tell()
+        self.start = time.perf_counter()
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            writer = self.writer
+            writer.profiler('tag', self.tag, writer._tell() - self.position, time.perf_counter() - self.start)
+
+
+class ProfilePendingContext(PendingContext):
+    """:class:`~htmlwriter.PendingContext` that reports to :attr:`~htmlwriter.XMLWriter.profiler` on exit."""
+    __slots__ = ('name', 'start', 'position')
+
+    def __init__(self, writer, method, args: tuple, kwargs: dict, name: str):
+        super().__init__(writer, method, args, kwargs)
+        self.name = name
+
+    def __enter__(self):
+        self.position = self.writer._tell()
+        self.start = time.perf_counter()
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            writer = self.writer
+            writer.profiler('method', self.name, writer._tell() - self.position, time.perf_counter() - self.start)
+
+
+class CompressedSink:
+    """Sink of :meth:`~htmlwriter.XMLWriter.stream` that compresses chunks with :mod:`zlib` while writing.
+
+    Only compressed data is sent to the target, so memory usage is compressed output and one chunk.
+    """
+    __slots__ = ('send', 'encoding', 'compressor')
+    #: `wbits` of :func:`zlib.compressobj` for each format
+    formats = {
+        'gzip': 31,
+        'deflate': 15,  # zlib container, as HTTP "Content-Encoding: deflate"
+        'raw': -15,
+    }
+
+    def __init__(self, send, format: str='gzip', level: int=6, encoding: str='utf-8'):
+        """
+        :param send: callable that receives compressed `bytes`
+        :param str format: `'gzip'`, `'deflate'` or `'raw'`
+        :param int level: compression level (0-9)
+        :param str encoding: encoding of chunks
+        """
+        import zlib  # NOTE: import on demand
+
+        self.send = send
+        self.encoding = encoding
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, self.formats[format])
+
+    def __call__(self, s: str):
+        data = self.compressor.compress(s.encode(self.encoding))
+        if data:
+            self.send(data)
+
+    def flush(self, finish: bool=False):
+        """Send compressed data of all received chunks.
+
+        :param bool finish: finish compressed stream if `True`, else sync flush (receiver can decompress all data
+                            received so far)
+        """
+        import zlib
+
+        data = self.compressor.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+        if data:
+            self.send(data)
+
+
+class Profile:
+    """Statistics of rendering, this can be used as :attr:`~htmlwriter.XMLWriter.profiler`.
+
+        >>> profile = Profile()
+        >>> h = HTML5Writer()
+        >>> h.profiler = profile  # or `XMLWriter.profiler = profile` for all writers
+        >>> h.p('hello')
+        <...>
+        >>> h.write('')
+        >>> profile.stats
+        {('method', 'p'): [1, 12, ...], ('tag', 'p'): [1, 12, ...]}
+
+    Sizes and times are inclusive, so the values of a tag contain the values of its children.
+    """
+
+    def __init__(self):
+        #: `{(kind, name): [calls, size, seconds]}`, kind is `'tag'` or `'method'`.
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, kind: str, name: str, size: int, seconds: float):
+        """Record a call.
+
+        :param str kind: `'tag'` or `'method'`
+        :param str name: tag name or method name
+        :param int size: count of written characters (bytes for :class:`~htmlwriter.BytesBuffer`)
+        :param float seconds: elapsed time
+        """
+        with self.lock:
+            stat = self.stats.get((kind, name))
+            if stat is None:
+                self.stats[(kind, name)] = [1, size, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += size
+                stat[2] += seconds
+
+    def clear(self):
+        with self.lock:
+            self.stats.clear()
+
+    def report(self, sort: str='seconds', limit: int=None) -> str:
+        """Get statistics as text table.
+
+        :param str sort: sort key, `'calls'`, `'size'` or `'seconds'`
+        :param int limit: maximum count of rows or `None`
+        :rtype: str
+        """
+        index = ('calls', 'size', 'seconds').index(sort)
+        with self.lock:
+            items = sorted(self.stats.items(), key=lambda i: i[1][index], reverse=True)[:limit]
+        lines = ['%-6s %-24s %8s %10s %10s' % ('kind', 'name', 'calls', 'size', 'ms')]
+        for (kind, name), (calls, size, seconds) in items:
+            lines.append('%-6s %-24s %8d %10d %10.3f' % (kind, name, calls, size, seconds * 1000))
+        return '\n'.join(lines)
+
+
+class TemplateContext:
+    """Context manager of deep template method. See :meth:`~htmlwriter.PreProcessor.make_from_deep`.
+
+    Operations before `template-yield` are executed on enter, operations after it are executed on exit.
+    """
+    __slots__ = ('writer', 'head', 'tail', 'args', 'attributes', 'stack')
+
+    def __init__(self, writer, head: list, tail: list, args: tuple, attributes: dict):
+        self.writer = writer
+        self.head = head
+        self.tail = tail
+        self.args = args
+        self.attributes = attributes
+        self.stack = []
+
+    def __enter__(self):
+        PreProcessor.run_program(self.writer, self.head, self.stack, self.args, self.attributes)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            return
+
+        PreProcessor.run_program(self.writer, self.tail, self.stack, self.args, self.attributes)
+        assert not self.stack, self.stack
+
+
+class AttributeFilter:
+    """Handler of `template-attributes`, this is created by :meth:`~htmlwriter.PreProcessor.compile_attributes`.
+
+    Pattern is glob style and `-` prefix means exclude pattern, ex. `'*, -class'`. Patterns are case insensitive.
+    """
+    __slots__ = ('patterns', 'includes', 'excludes', 'names')
+    #: Template attribute name without `template-` prefix.
+    template_attribute = 'attributes'
+    #: Maximum size of :attr:`~names`.
+    names_maxsize = 1024
+
+    def __init__(self, patterns: str):
+        """
+        :param str patterns: value of `template-attributes`
+        """
+        includes = []
+        excludes = []
+
+        for pattern in patterns.split(',') if ',' in patterns else patterns.split():
+            pattern = pattern.strip()
+            if not pattern.startswith('-'):
+                includes.append(fnmatch.translate(pattern))
+            else:
+                excludes.append(fnmatch.translate(pattern[1:]))
+
+        self.patterns = patterns
+        self.includes = re.compile('^(' + '|'.join(includes) + ')$', flags=re.IGNORECASE).match
+        self.excludes = re.compile('^(' + '|'.join(excludes) + ')$', flags=re.IGNORECASE).match
+        #: Cache of matching result, `{attribute_name: bool}`
+        self.names = {}
+
+    def __reduce__(self):
+        return self.__class__, (self.patterns, )
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.patterns)
+
+    def __call__(self, input_attributes: dict) -> dict:
+        """
+        :param dict input_attributes: source attributes
+        :return: filtered attributes
+        :rtype: dict
+        """
+        names = self.names
+        result = {}
+
+        for name, value in input_attributes.items():
+            match = names.get(name)
+            if match is None:
+                match = not self.excludes(name) and bool(self.includes(name))
+                if len(names) < self.names_maxsize:
+                    names[name] = match
+            if match:
+                result[name] = value
+
+        return result
+
+
+class AttributeClassMap:
+    """Handler of `template-attribute-map-class`, this is created by
+    :meth:`~htmlwriter.PreProcessor.compile_attribute_map_class`.
+
+    Patterns are comma separated attribute names, and class name is specified by `as`, ex.
+    `'active, disabled as btn-disabled'`. Class is added if the attribute value is true.
+    """
+    __slots__ = ('patterns', 'items')
+    #: Template attribute name without `template-` prefix.
+    template_attribute = 'attribute-map-class'
+
+    def __init__(self, patterns: str):
+        """
+        :param str patterns: value of `template-attribute-map-class`
+        """
+        items = []
+
+        for line in patterns.split(','):
+            match = re.search('(\\S+)\\s+as\\s+(\\S+)', line)
+            if match:
+                items.append(match.groups())
+            else:
+                items.append((line.strip(), line.strip()))
+
+        self.patterns = patterns
+        #: `((attribute_name, class_name), ...)`
+        self.items = tuple(items)
+
+    def __reduce__(self):
+        return self.__class__, (self.patterns, )
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.patterns)
+
+    def __call__(self, input_attributes: dict) -> dict:
+        """
+        :param dict input_attributes: source attributes
+        :return: `{'class': class_names}` or empty `dict`
+        :rtype: dict
+        """
+        classes = [alias for name, alias in self.items if input_attributes.get(name)]
+        return {'class': ' '.join(dict.fromkeys(classes))} if classes else {}
+
+
 class TagMethodHelper:
     """Method wrapper for some features:
 
         * Register and cleanup :attr:`~htmlwriter.XMLWriter._pending`.
         * `Conetxt manager` without function calling.
+
+    Bound helper is created once per writer instance and stored in instance dict as :attr:`~attribute_name`, unless
+    the name is overridden in subclass.
     """
+    #: Attribute name in writer class, bound helper is cached in writer instance with this name.
+    attribute_name = None
 
     def __init__(self, method, *args, **kwargs):
         """
@@ -94,13 +678,32 @@ class TagMethodHelper:
         self.method = method
         self.args = args
         self.kwargs = kwargs
-        self.context_manager = None
+        self.context_managers = []
         functools.update_wrapper(self, method)
 
+    def __set_name__(self, owner, name):
+        self.attribute_name = name
+
     def __get__(self, obj, type=None):
-        result = self.__class__(self.method.__get__(obj, type), *self.args, **self.kwargs)
-        result.__name__ = self.__name__
-        result.__doc__ = self.__doc__
+        if obj is None:
+            return self
+
+        # NOTE: copy instead of __init__ for skipping `functools.update_wrapper`
+        result = object.__new__(self.__class__)
+        result.__dict__.update(self.__dict__)
+        result.method = self.method.__get__(obj, type)
+        result.context_managers = []
+
+        # NOTE: cache only if this is the method of the writer class, not the method of base class which is
+        #       overridden (ex. called by `super().p()`)
+        name = self.attribute_name
+        if name:
+            for klass in obj.__class__.__mro__:
+                if name in klass.__dict__:
+                    if klass.__dict__[name] is self:
+                        obj.__dict__[name] = result
+                    break
+
         return result
 
     def __str__(self):
@@ -111,33 +714,58 @@ class TagMethodHelper:
 
     def __call__(self, *args, **kwargs):
         method = self.method
-        args = self.args + args
-        kwargs = dict(self.kwargs, **kwargs)
+        if self.args:
+            args = self.args + args
+        if self.kwargs:
+            kwargs = dict(self.kwargs, **kwargs)
         writer = method.__self__
 
-        @contextlib.contextmanager
-        def helper():
-            assert writer._pending is pending, '%s' % (writer._pending, )
-            writer._pending = None
-            with method(*args, **kwargs):
-                yield
-
         writer.write('')  # consume writer._pending
         assert writer._pending is None, '%s' % (writer._pending, )
 
-        writer._pending = pending = helper()
+        if writer.profiler is None:
+            writer._pending = pending = PendingContext(writer, method, args, kwargs)
+        else:
+            writer._pending = pending = ProfilePendingContext(writer, method, args, kwargs,
+                                                              self.attribute_name or self.__name__)
         return pending
 
     def __enter__(self):
-        assert self.context_manager is None
-        self.context_manager = contextlib.ExitStack()
-        return self.context_manager.enter_context(self.method(*self.args, **self.kwargs))
+        if self.method.__self__.profiler is None:
+            context_manager = self.method(*self.args, **self.kwargs)
+        else:
+            context_manager = self()
+        self.context_managers.append(context_manager)
+        return context_manager.__enter__()
 
     def __exit__(self, *args):
-        del args
-        assert self.context_manager
-        self.context_manager.close()
-        self.context_manager = None
+        assert self.context_managers
+        return self.context_managers.pop().__exit__(*args)
+
+
+class TemplateMethodHelper(TagMethodHelper):
+    # :class:`~htmlwriter.TagMethodHelper` of method generated from template, document is generated on demand.
+
+    def __init__(self, method, doc, *args, **kwargs):
+        """
+        :param function method: original function
+        :param doc: document string or callable that returns document
+        :param args: bound positional arguments
+        :param kwargs: bound keyword arguments
+        """
+        self.doc = doc
+        super().__init__(method, *args, **kwargs)
+
+    @property
+    def __doc__(self):
+        result = self.__dict__.get('_doc')
+        if result is None:
+            result = self._doc = self.doc() if callable(self.doc) else self.doc
+        return result
+
+    @__doc__.setter
+    def __doc__(self, value):
+        self._doc = value
 
 
 class PreProcessor(type):
@@ -146,21 +774,272 @@ class PreProcessor(type):
     This is a metaclass of :class:`~htmlwriter.XMLWriter`.
     """
 
+    #: Lock for lazy compiling of :attr:`~htmlwriter.XMLWriter._template`.
+    lock = threading.RLock()
+    #: Registry of compiled templates, `{template_string: [(name, method), ...]}`.
+    compiled_templates = {}
+    #: Directory of compiled template cache files or `None` (disabled). Default is environment variable
+    #: `HTMLWRITER_CACHE_DIR`.
+    cache_dir = os.environ.get('HTMLWRITER_CACHE_DIR')
+    #: Format number of cache files, this is increased when compiled representation is changed.
+    cache_format = 5
+    #: Template attributes (without `template-` prefix) whose handlers can be stored in cache files, handler has
+    #: `template_attribute` and `patterns` attributes and it's rebuilt by `compile_*` method.
+    cache_handlers = ('attributes', 'attribute-map-class')
+    #: Class attributes that are folded into :class:`~htmlwriter.TagProfile`, see :meth:`~compile_tag_profiles`.
+    tag_profile_attributes = ('_no_end_tags', '_require_end_tags', '_boolean_attributes', '_merge_attribute_handlers')
+
     def __new__(cls, name, bases, classdict):
         klass = type.__new__(cls, name, bases, dict(classdict))
-        cls.compile_template(klass)
+        cls.compile_attribute_rename_patterns(klass)
+        cls.compile_tag_profiles(klass)
+        # NOTE: template is compiled on first instantiation or first missing attribute access, see `compile_class`
+        klass._template_compiled = False
         return klass
 
+    def __call__(self, *args, **kwargs):
+        if not self._template_compiled:
+            PreProcessor.compile_class(self)
+        return super().__call__(*args, **kwargs)
+
+    def __setattr__(self, name, value):
+        type.__setattr__(self, name, value)
+        if name in PreProcessor.tag_profile_attributes:
+            compile = PreProcessor.compile_tag_profiles
+        elif name == '_attribute_rename_patterns':
+            compile = PreProcessor.compile_attribute_rename_patterns
+        else:
+            return
+
+        # rebuild the class and subclasses which inherit the value
+        classes = [self]
+        while classes:
+            klass = classes.pop()
+            compile(klass)
+            classes.extend(type.__subclasses__(klass))
+
+    def __getattr__(self, name):
+        # called only when attribute is missing
+        if name.startswith('__') or self._template_compiled:
+            raise AttributeError(name)
+        PreProcessor.compile_class(self)
+        return type.__getattribute__(self, name)
+
+    def __dir__(self):
+        if not self._template_compiled:
+            PreProcessor.compile_class(self)
+        return super().__dir__()
+
+    @classmethod
+    def compile_class(cls, writer_class):
+        """Compile :attr:`~htmlwriter.XMLWriter._template` of class and its base classes if not compiled yet.
+
+        :param XMLWriter writer_class: target class
+        """
+        with cls.lock:
+            for klass in reversed(writer_class.__mro__):
+                if isinstance(klass, PreProcessor) and not klass.__dict__['_template_compiled']:
+                    cls.compile_template(klass)
+                    klass._template_compiled = True
+
+    @classmethod
+    def compile_tag_profiles(cls, writer_class):
+        """Build :class:`~htmlwriter.TagProfile` of tags which are named in :attr:`~tag_profile_attributes`, and reset
+        cache of other tags and :attr:`~htmlwriter.XMLWriter._begin_tags`.
+
+        :param XMLWriter writer_class: target class
+        """
+        tags = set(writer_class._no_end_tags)
+        if writer_class._require_end_tags is not True:
+            tags.update(writer_class._require_end_tags)
+        tags.update(tag for tag, _ in writer_class._boolean_attributes if tag is not None)
+        tags.update(tag for tag, _ in writer_class._merge_attribute_handlers if tag is not None)
+
+        writer_class._tag_profiles = {tag: TagProfile(writer_class, tag) for tag in tags}
+        writer_class._begin_tags = {}
+
+    @classmethod
+    def compile_attribute_rename_patterns(cls, writer_class):
+        """Compile :attr:`~htmlwriter.XMLWriter._attribute_rename_patterns` and reset cache of renamed attribute
+        names and :attr:`~htmlwriter.XMLWriter._begin_tags`.
+
+        :param XMLWriter writer_class: target class
+        """
+        writer_class._compiled_attribute_rename_patterns = tuple(
+            (re.compile(pattern), repl) for pattern, repl in writer_class._attribute_rename_patterns)
+        writer_class._attribute_names = {}
+        writer_class._begin_tags = {}
+
     @classmethod
     def compile_template(cls, writer_class):
         """Generate methods from string.
 
+        Inherited :attr:`~htmlwriter.XMLWriter._template` is not compiled again, methods are inherited too. And
+        methods of same template string are shared by :attr:`~compiled_templates`.
+
         :param XMLWriter writer_class: target class
         """
-        if not writer_class._template:
+        template = writer_class.__dict__.get('_template')
+        if not template:
             return
 
-        doc = parse_xml(writer_class._template)
+        try:
+            methods = cls.compiled_templates[template]
+        except KeyError:
+            methods = cls.compiled_templates[template] = cls.make_methods(template)
+
+        for name, method in methods:
+            setattr(writer_class, name, method)
+
+    @classmethod
+    def make_methods(cls, template: str) -> list:
+        """Generate methods from template string. Compiled template is cached in :attr:`~cache_dir` if it is set.
+
+        :param str template: template string, see :attr:`~htmlwriter.XMLWriter._template`
+        :return: list of `(name, method)`
+        :rtype: list
+        """
+        entries = None
+
+        if cls.cache_dir:
+            entries = cls.read_cache(template)
+            if entries is None:
+                entries = cls.compile_entries(template)
+                cls.write_cache(template, entries)
+
+        else:
+            entries = cls.compile_entries(template)
+
+        result = []
+
+        for name, kind, data, doc in entries:
+            if kind == 'deep':
+                method = cls.make_deep_method(*data)
+            else:
+                method = cls.make_shallow_method(*data)
+
+            method = TemplateMethodHelper(method, doc)
+            method.__name__ = method.attribute_name = name
+            method._signature = '[text: str, ]**attributes'
+            result.append((name, method))
+
+        return result
+
+    @classmethod
+    def get_cache_path(cls, template: str) -> str:
+        """Get path of compiled template cache file, this is unique for template string and library version.
+
+        :param str template: template string
+        :rtype: str
+        """
+        import hashlib  # NOTE: import on demand, cache is optional
+
+        version = '%s.%d' % (__version__, cls.cache_format)
+        key = hashlib.sha1((version + '\0' + template).encode('utf-8')).hexdigest()
+        return os.path.join(cls.cache_dir, 'htmlwriter-%s-%s.json' % (version, key))
+
+    @classmethod
+    def read_cache(cls, template: str):
+        """Read compiled template from cache file. Cache file is JSON, so reading it never executes code.
+
+        :param str template: template string
+        :return: list of entries (see :meth:`~compile_entries`) or `None` if cache is missing or stale
+        """
+        try:
+            with open(cls.get_cache_path(template), 'r', encoding='utf-8') as f:
+                version, cached_template, entries = json.load(f)
+            if version != '%s.%d' % (__version__, cls.cache_format) or cached_template != template:
+                return None
+            return cls.load_entries(entries)
+        except Exception:  # missing or broken file
+            return None
+
+    @classmethod
+    def write_cache(cls, template: str, entries: list):
+        """Write compiled template to cache file.
+
+        :param str template: template string
+        :param list entries: return value of :meth:`~compile_entries`
+        """
+        path = cls.get_cache_path(template)
+        temp_path = '%s.%d.tmp' % (path, os.getpid())
+
+        try:
+            data = json.dumps(('%s.%d' % (__version__, cls.cache_format), template, cls.dump_entries(entries)))
+            os.makedirs(cls.cache_dir, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except (OSError, ValueError) as e:
+            warnings.warn('unable to write template cache: %s' % (e, ))
+
+    @classmethod
+    def dump_entries(cls, entries: list) -> list:
+        """Convert entries into JSON serializable form. Handlers of operations are stored as
+        `[template_attribute, patterns]`, see :attr:`~cache_handlers`.
+
+        :param list entries: return value of :meth:`~compile_entries`
+        :rtype: list
+        """
+        def dump_handler(handler):
+            name = getattr(handler, 'template_attribute', None)
+            if name not in cls.cache_handlers:
+                raise ValueError('not cacheable handler: %r' % (handler, ))
+            return [name, handler.patterns]
+
+        def dump_program(program):
+            return [[op[0], op[1], op[2], [dump_handler(i) for i in op[3]]] if op[0] == 'begin' else list(op)
+                    for op in program]
+
+        result = []
+        for name, kind, data, doc in entries:
+            if kind == 'deep':
+                data = [dump_program(i) for i in data]
+            result.append([name, kind, list(data), doc() if callable(doc) else doc])
+        return result
+
+    @classmethod
+    def load_entries(cls, entries: list) -> list:
+        """Restore entries from return value of :meth:`~dump_entries`. Handlers are rebuilt from patterns by
+        `compile_*` method.
+
+        :param list entries: JSON deserialized entries
+        :rtype: list
+        """
+        def load_handler(name, patterns):
+            if name not in cls.cache_handlers or not isinstance(patterns, str):
+                raise ValueError('not cacheable handler: %r' % (name, ))
+            return getattr(cls, 'compile_' + re.sub('\\W+', '_', name))(patterns)
+
+        def load_program(program):
+            return [(op[0], op[1], op[2], tuple(load_handler(*i) for i in op[3])) if op[0] == 'begin' else tuple(op)
+                    for op in program]
+
+        result = []
+        for name, kind, data, doc in entries:
+            if kind == 'deep':
+                data = [load_program(i) for i in data]
+            elif kind != 'shallow':
+                raise ValueError('unknown kind: %r' % (kind, ))
+            result.append((name, kind, tuple(data), doc))
+        return result
+
+    @classmethod
+    def compile_entries(cls, template: str) -> list:
+        """Compile template string into entries, they are stored in cache file by :meth:`~dump_entries`.
+
+        Entry is `(name, kind, data, doc)`:
+            * `kind` is `'shallow'` and `data` is arguments of :meth:`~make_shallow_method`
+            * `kind` is `'deep'` and `data` is arguments of :meth:`~make_deep_method`
+            * `doc` is document string or callable that returns it
+
+        :param str template: template string, see :attr:`~htmlwriter.XMLWriter._template`
+        :return: list of entries
+        :rtype: list
+        """
+        result = []
+
+        doc = parse_xml(_sub_html_reference(_template_reference + '\\1;', template))
 
         for e in doc:
             e.tail = ''
@@ -174,15 +1053,12 @@ class PreProcessor(type):
             #     continue
 
             if len(e):
-                method = cls.make_from_deep(e)
+                result.append((name, 'deep', cls.compile_program(e), functools.partial(cls.get_doc, e)))
 
             else:
-                method = cls.make_from_shallow(e)
+                result.append((name, 'shallow', cls.compile_shallow(e), functools.partial(cls.get_doc, e)))
 
-            method = TagMethodHelper(method)
-            method.__name__ = name
-            method._signature = '[text: str, ]**attributes'
-            setattr(writer_class, name, method)
+        return result
 
     @classmethod
     def get_name(cls, prefix: str, e: etree.Element) -> str:
@@ -211,154 +1087,396 @@ class PreProcessor(type):
         return name
 
     @classmethod
-    def make_from_shallow(cls, e: etree.Element):
-        """Generate method from element.
+    def make_from_shallow(cls, e: etree.Element):
+        """Generate method from element.
+
+        :param Element e: source element
+        :return: not bound method
+        :rtype: function
+        """
+        return cls.make_shallow_method(*cls.compile_shallow(e))
+
+    @classmethod
+    def compile_shallow(cls, e: etree.Element) -> tuple:
+        """Get arguments of :meth:`~make_shallow_method` from element. Default text content is escaped like text of
+        :meth:`~compile_program`.
+
+        :param Element e: source element
+        :return: tag name, default attributes and default text content
+        :rtype: tuple(str, dict, str)
+        """
+        attributes = {k: v.replace(_template_reference, '&') for k, v in e.attrib.items()}
+        return e.tag, attributes, None if e.text is None else _escape_template_text(e.text)
+
+    @classmethod
+    def make_shallow_method(cls, tag: str, default_attributes: dict, default_content: str):
+        """Generate method of single tag.
+
+        :param str tag: tag name
+        :param dict default_attributes: default attributes
+        :param str default_content: default text content
+        :return: not bound method
+        :rtype: function
+        """
+        # keys of `XMLWriter._begin_tags` for begin tag string of `default_attributes`
+        key = object()
+        minified_key = object()
+
+        def result(self, *args, **attributes):
+            assert len(args) <= 1, 'too many arguments'
+            content = args[0] if args else default_content
+
+            if not attributes:
+                begin_tags = self._begin_tags
+                k = minified_key if self.minify else key
+                begin_tag = begin_tags.get(k)
+                if begin_tag is None:
+                    begin_tag = begin_tags[k] = \
+                        self._get_begin_tag(tag, **self._merge_attributes(tag, default_attributes))
+                return self._element(tag, begin_tag, content)
+
+            return self._element(
+                tag, self._get_begin_tag(tag, **self._merge_attributes(tag, default_attributes, attributes)), content)
+
+        return result
+
+    @classmethod
+    def make_from_deep(cls, root: etree.Element):
+        """Generate method from element.
+
+        :param Element root: source element
+        :return: not bound method
+        :rtype: function
+        """
+        return cls.make_deep_method(*cls.compile_program(root))
+
+    @classmethod
+    def make_deep_method(cls, head: list, tail: list):
+        """Generate method of operations. See :meth:`~compile_program`.
 
-        :param Element e: source element
+        `('begin', ...)` operation without handlers is replaced with `('static', tag, attributes, key, minified_key)`,
+        its begin tag is cached in :attr:`~htmlwriter.XMLWriter._begin_tags` with the keys.
+
+        :param list head: operations before `template-yield`
+        :param list tail: operations after `template-yield`
         :return: not bound method
         :rtype: function
         """
-        tag = e.tag
-        default_attributes = e.attrib.copy()
-        default_content = e.text
+        def link(program):
+            return [('static', op[1], op[2], object(), object()) if op[0] == 'begin' and not op[3] else op
+                    for op in program]
+
+        head = link(head)
+        tail = link(tail)
 
         def result(self, *args, **attributes):
-            if not args:
-                args = (default_content, )
-            return self._tag(tag, *args, **self._merge_attributes(tag, default_attributes, attributes))
+            return TemplateContext(self, head, tail, args, attributes)
 
-        result.__doc__ = 'Write or enter "%s".\nSee :func:`~XMLWriter.tag`.' % (
-            etree.tostring(e, encoding='unicode').replace('&amp;', '&'), )
         return result
 
     @classmethod
-    def make_from_deep(cls, root: etree.Element):
-        """Generate method from element.
+    def get_doc(cls, e: etree.Element) -> str:
+        """Generate document of method from element.
+
+        :param Element e: source element
+        :return: document string
+        :rtype: str
+        """
+        source = etree.tostring(e, encoding='unicode').replace(_template_reference, '&')
+
+        if not len(e):
+            return 'Write or enter "%s".\nSee :func:`~XMLWriter.tag`.' % (source, )
+
+        tmpl = textwrap.indent(textwrap.dedent(source), '    ')
+        return 'Write or enter template:\n\n.. code-block:: xml\n\n' + tmpl
+
+    @classmethod
+    def compile_program(cls, root: etree.Element) -> tuple:
+        """Flatten nested element into a list of operations.
+
+        Operations are tuple of:
+            * `('write', str)`: write static string
+            * `('begin', tag, attributes, handlers)`: enter tag, `handlers` is tuple of `handler(attributes) -> dict`
+              compiled by `compile_*` method (ex. :meth:`~compile_attributes`)
+            * `('end', )`: exit last entered tag
+            * `('content', default_text)`: write first positional argument or default text
 
         :param Element root: source element
-        :return: not bound method
-        :rtype: function
+        :return: operations before and after `template-yield`
+        :rtype: tuple(list, list)
         """
         prefix = 'template-'
+        program = []
 
-        def result(self, *args, **attributes):
-            pause = object()
-
-            @contextlib.contextmanager
-            def walk(node):
-                if node.tag == prefix + 'content':
-                    if args:
-                        self.text(*args)
-                    else:
-                        self.write(node.text or '')
-                    yield
-                    self.write(node.tail)
+        def emit(*op):
+            if op[0] == 'write':
+                if not op[1]:
                     return
-
-                elif node.tag == prefix + 'yield':
-                    yield pause
+                if program and program[-1][0] == 'write':
+                    program[-1] = ('write', program[-1][1] + op[1])
                     return
+            program.append(op)
+
+        def walk(node):
+            if node.tag == prefix + 'content':
+                emit('content', _escape_template_text(node.text or ''))
+                emit('write', _escape_template_text(node.tail or ''))
+                return
+
+            elif node.tag == prefix + 'yield':
+                if ('yield', ) in program:
+                    raise ValueError('multiple yield: %s' % (etree.tostring(root, encoding='unicode'), ))
+                emit('yield')
+                return
+
+            elif node.tag.startswith(prefix):
+                raise NotImplementedError(
+                    'not supported element: %s' % (etree.tostring(node, encoding='unicode'), ))
+
+            imported_attributes = {}
+            handlers = []
+            for name, value in node.attrib.items():
+                value = value.replace(_template_reference, '&')
+                if not name.startswith(prefix):
+                    imported_attributes[name] = value
+                else:
+                    name = name[len(prefix):]
+                    handlers.append(getattr(cls, 'compile_' + re.sub('\\W+', '_', name))(value))
+
+            emit('begin', node.tag, imported_attributes, tuple(handlers))
+            # NOTE: parser decodes '&amp;' and '&lt;', '&' of HTML entity references (ex. '&nbsp;') is replaced with
+            #       `_template_reference` by `compile_entries`
+            emit('write', _escape_template_text(node.text or ''))
+            for i in node:
+                walk(i)
+            if node is root and ('yield', ) not in program:
+                emit('yield')
+            emit('end')
+            emit('write', _escape_template_text(node.tail or ''))
+
+        walk(root)
+
+        i = program.index(('yield', ))
+        return program[:i], program[i + 1:]
+
+    @staticmethod
+    def run_program(writer, program: list, stack: list, args: tuple, attributes: dict):
+        """Execute operations generated by :meth:`~htmlwriter.PreProcessor.compile_program` and linked by
+        :meth:`~htmlwriter.PreProcessor.make_deep_method`.
+
+        :param XMLWriter writer: target writer
+        :param list program: operations
+        :param list stack: entered tags, this is shared before and after `template-yield`
+        :param tuple args: positional arguments of template method
+        :param dict attributes: keyword arguments of template method
+        """
+        for op in program:
+            code = op[0]
 
-                elif node.tag.startswith(prefix):
-                    raise NotImplementedError(
-                        'not supported element: %s' % (etree.tostring(node, encoding='unicode'), ))
-
-                imported_attributes = {}
-                handlable_attributes = {}
-                for name, value in node.attrib.items():
-                    if not name.startswith(prefix):
-                        imported_attributes[name] = value
-                    else:
-                        name = name[len(prefix):]
-                        handlable_attributes[name] = value
-
-                for name, value in handlable_attributes.items():
-                    handler = getattr(cls, 'handle_' + re.sub('\\W+', '_', name))
-                    imported_attributes = \
-                            self._merge_attributes(node.tag, imported_attributes, handler(value, attributes))
-
-                with self.tag(node.tag, **imported_attributes):
-                    self.write(node.text or '')
-
-                    yielded = False
-                    for i in node:
-                        with walk(i) as _:
-                            if _ is pause:
-                                assert not yielded
-                                yielded = True
-                                yield pause
-                    if not yielded:
-                        yield
-
-                self.write(node.tail or '')
-
-            return walk(root)
-
-        tmpl = textwrap.indent(textwrap.dedent(etree.tostring(root, encoding='unicode').replace('&amp;', '&')), '    ')
-        result.__doc__ = 'Write or enter template:\n\n.. code-block:: xml\n\n' + tmpl
-        # result.__doc__ = etree.tostring(root, encoding='unicode').replace('&amp;', '&')
-        return result
+            if code == 'write':
+                if writer.indent is None and not writer.minify:
+                    writer.write(op[1])
+                else:
+                    writer._write_template_text(op[1])
+
+            elif code == 'static':
+                _, tag, imported_attributes, key, minified_key = op
+                begin_tags = writer._begin_tags
+                if writer.minify:
+                    key = minified_key
+                begin_tag = begin_tags.get(key)
+                if begin_tag is None:
+                    begin_tag = begin_tags[key] = \
+                        writer._get_begin_tag(tag, **writer._merge_attributes(tag, imported_attributes))
+                context_manager = writer._element(tag, begin_tag)
+                context_manager.__enter__()
+                stack.append(context_manager)
+
+            elif code == 'begin':
+                _, tag, imported_attributes, handlers = op
+                imported_attributes = writer._merge_attributes(
+                    tag, imported_attributes, *[handler(attributes) for handler in handlers])
+                context_manager = writer._element(tag, writer._get_begin_tag(tag, **imported_attributes))
+                context_manager.__enter__()
+                stack.append(context_manager)
+
+            elif code == 'end':
+                stack.pop().__exit__(None, None, None)
+
+            elif code == 'content':
+                if args:
+                    writer.text(*args)
+                elif writer.indent is None and not writer.minify:
+                    writer.write(op[1])
+                else:
+                    writer._write_template_text(op[1])
 
     @classmethod
-    def handle_attributes(cls, patterns: str, input_attributes: dict) -> dict:
-        """Handle `template-attributes`.
+    def compile_attributes(cls, patterns: str) -> AttributeFilter:
+        """Compile `template-attributes`.
+
+        :param str patterns: handling attribute value (ex. '*, -class')
+        :rtype: AttributeFilter
+        """
+        return AttributeFilter(patterns)
+
+    @classmethod
+    def compile_attribute_map_class(cls, patterns: str) -> AttributeClassMap:
+        """Compile `template-attribute-map-class`.
 
-        Pattern is glob style and `-` prefix means exclude pattern.
+        :param str patterns: handling attribute value (ex. 'active, disabled as btn-disabled')
+        :rtype: AttributeClassMap
+        """
+        return AttributeClassMap(patterns)
+
+    @classmethod
+    def handle_attributes(cls, patterns: str, input_attributes: dict) -> dict:
+        """Handle `template-attributes`. This is same as `compile_attributes(patterns)(input_attributes)`.
 
         :param str patterns: handling attribute value
         :param dict input_attributes: source attributes
         :return: filtered attributes
         :rtype: dict
         """
-        includes = []
-        excludes = []
-
-        patterns = patterns.split(',') if ',' in patterns else patterns.split()
-        for pattern in patterns:
-            pattern = pattern.strip()
-            if not pattern.startswith('-'):
-                includes.append(fnmatch.translate(pattern))
-            else:
-                excludes.append(fnmatch.translate(pattern[1:]))
-
-        includes = re.compile('^(' + '|'.join(includes) + ')$', flags=re.IGNORECASE)
-        excludes = re.compile('^(' + '|'.join(excludes) + ')$', flags=re.IGNORECASE)
-
-        result = {}
-
-        for name, value in input_attributes.items():
-            if excludes.match(name):
-                continue
-            elif includes.match(name):
-                result[name] = value
-
-        return result
+        return cls.compile_attributes(patterns)(input_attributes)
 
     @classmethod
     def handle_attribute_map_class(cls, patterns: str, input_attributes: dict) -> dict:
-        """Handle `template-attribute-map-class`.
+        """Handle `template-attribute-map-class`. This is same as
+        `compile_attribute_map_class(patterns)(input_attributes)`.
 
         :param str patterns: handling attribute value (ex. 'active, disabled as btn-disabled')
         :param dict input_attributes: source attributes
         :return: filtered attributes
         :rtype: dict
         """
-        classes = set()
+        return cls.compile_attribute_map_class(patterns)(input_attributes)
 
-        for line in patterns.split(','):
-            match = re.search('(\\S+)\\s+as\\s+(\\S+)', line)
-            if match:
-                name, alias = match.groups()
-            else:
-                name = alias = line.strip()
 
-            if input_attributes.get(name):
-                classes.add(alias)
+class StringIOBuffer(StringIO):
+    """Output buffer of :class:`~htmlwriter.XMLWriter` based on :class:`io.StringIO`.
+
+    Output buffer must provide `write(str)`, `getvalue() -> str`, `drain() -> str` (get and clear),
+    `getbuffer(prologue, epilogue) -> memoryview` and `__len__`.
+    """
+
+    def drain(self) -> str:
+        """Get the written string and clear buffer.
+
+        :rtype: str
+        """
+        result = self.getvalue()
+        self.seek(0)
+        self.truncate()
+        return result
+
+    def getbuffer(self, prologue: str, epilogue: str) -> memoryview:
+        """Get UTF-8 encoded content between `prologue` and `epilogue`.
+
+        :param str prologue: string before content
+        :param str epilogue: string after content
+        :rtype: memoryview
+        """
+        return memoryview((prologue + self.getvalue() + epilogue).encode('utf-8'))
+
+    def __len__(self):
+        return self.tell()
+
+
+class ListBuffer:
+    """Output buffer of :class:`~htmlwriter.XMLWriter` based on list of written strings, strings are joined once on
+    :meth:`~getvalue`.
+    """
+    __slots__ = ('chunks', 'size')
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, s: str):
+        self.chunks.append(s)
+        self.size += len(s)
+
+    def getvalue(self) -> str:
+        result = ''.join(self.chunks)
+        self.chunks[:] = (result, )
+        return result
+
+    def drain(self) -> str:
+        result = ''.join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        return result
+
+    def getbuffer(self, prologue: str, epilogue: str) -> memoryview:
+        self.chunks.insert(0, prologue)
+        self.chunks.append(epilogue)
+        try:
+            return memoryview(''.join(self.chunks).encode('utf-8'))
+        finally:
+            del self.chunks[0], self.chunks[-1]
 
-        return {'class': ' '.join(classes)} if classes else {}
+    def __len__(self):
+        return self.size
 
 
-class XMLWriter(StringIO, metaclass=PreProcessor):
+class BytesBuffer:
+    """Output buffer of :class:`~htmlwriter.XMLWriter` based on encoded `bytearray`.
+
+    Content is encoded on writing, and :meth:`~getbuffer` returns a view of the buffer itself. Prologue is put in
+    reserved space before content (see :attr:`~headroom`), so it doesn't copy content. Like
+    :meth:`io.BytesIO.getbuffer`, the buffer can't be written while the view is alive.
+    """
+    __slots__ = ('data', 'encoding', 'start', 'end')
+    #: Reserved bytes for prologue of :meth:`~getbuffer`.
+    headroom = 256
+
+    def __init__(self, encoding: str='utf-8'):
+        self.data = bytearray(self.headroom)
+        self.encoding = encoding
+        #: offset of content
+        self.start = self.headroom
+        #: offset of epilogue or `None`
+        self.end = None
+
+    def write(self, s: str):
+        if self.end is not None:
+            del self.data[self.end:]  # remove epilogue
+            self.end = None
+        self.data += s.encode(self.encoding)
+
+    def getvalue(self) -> str:
+        return self.data[self.start:self.end].decode(self.encoding)
+
+    def drain(self) -> str:
+        result = self.getvalue()
+        del self.data[self.start:]
+        self.end = None
+        return result
+
+    def getbuffer(self, prologue: str, epilogue: str) -> memoryview:
+        prologue = prologue.encode(self.encoding)
+
+        if self.end is not None:
+            del self.data[self.end:]
+
+        start = self.start - len(prologue)
+        if start >= 0:
+            self.data[start:self.start] = prologue
+            del self.data[:start]  # NOTE: deleting head of bytearray doesn't move content
+        else:
+            self.data[:self.start] = prologue
+
+        self.start = len(prologue)
+        self.end = len(self.data)
+        self.data += epilogue.encode(self.encoding)
+        return memoryview(self.data)
+
+    def __len__(self):
+        return (self.end if self.end is not None else len(self.data)) - self.start
+
+
+class XMLWriter(metaclass=PreProcessor):
     """\
     Base writer class. This provides useful functions for writing XML content.
 
@@ -372,6 +1490,10 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
     Note that :meth:`~tag` returns
     `context manager <https://docs.python.org/3/library/stdtypes.html#context-manager-types>`_.
     So you can use `with statement <https://docs.python.org/3/reference/compound_stmts.html#with>`_ with it.
+
+    Writer supports a part of file API of :class:`io.StringIO`: :meth:`~write`, :meth:`~writelines`, :meth:`~tell`,
+    :meth:`~close` and `with statement` (closes writer on exit). Content is written to :attr:`~buffer`, so `seek`,
+    `read` and `truncate` are not supported.
     """
     _signature = '[doctype: str, ]root_tag: str, **root_attributes'
     #: XML declaration string or `None`. This will be written before content on :meth:`~getvalue`.
@@ -387,11 +1509,24 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
     #: See source of :class:`~htmlwriter.PreProcessor` for implementation.
     _template = '<template></template>'
     #: Set of tag name that does not require end tag.
-    #: See source of :meth:`~htmlwriter.XMLWriter._tag` for implementation.
+    #: See :class:`~htmlwriter.TagProfile` for implementation.
     _no_end_tags = set()
     #: Set of tag name that must have end tag.
-    #: See source of :meth:`~htmlwriter.XMLWriter._tag` for implementation.
+    #: See :class:`~htmlwriter.TagProfile` for implementation.
     _require_end_tags = set()
+    #: Set of tag name that is written in line with text in pretty printing (see :attr:`~indent`).
+    _inline_tags = set()
+    #: Set of tag name that content is written as is in pretty printing (see :attr:`~indent`).
+    _preformatted_tags = set()
+    #: End tags that can be omitted in minify mode (see :attr:`~minify`),
+    #: `{tag: (following_tags, excluded_parent_tags)}`. End tag is omitted if next sibling is one of `following_tags`,
+    #: or there is no more content in parent and parent isn't one of `excluded_parent_tags` (`None` means never).
+    _optional_end_tags = {}
+    #: Set of attribute name that is written in short form in minify mode (see :attr:`~minify`), if the value is
+    #: `True`, `''` or same as attribute name.
+    _short_boolean_attributes = set()
+    #: Attribute value is written without quotes in minify mode if it is safe (see :attr:`~minify`).
+    _unquoted_attributes = False
     #: Tuple of boolean attribute (attribute without value. ex <input disabled/>).
     #: Item may be `(None, 'attribute_name')` or `('tag_name', 'attribute_name')`.
     _boolean_attributes = set()
@@ -401,6 +1536,33 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
     _attribute_rename_patterns = (
         ('^(xml|xmlns)_(.+)', '\\1:\\2'),
     )
+    #: Compiled :attr:`~htmlwriter.XMLWriter._attribute_rename_patterns`, this is generated by
+    #: :class:`~htmlwriter.PreProcessor` for each class, and rebuilt when the patterns of the class are set.
+    _compiled_attribute_rename_patterns = ()
+    #: Cache of renamed attribute names (`{name: renamed_name}`), this is generated by
+    #: :class:`~htmlwriter.PreProcessor` for each class.
+    _attribute_names = {}
+    #: Maximum size of :attr:`~htmlwriter.XMLWriter._attribute_names`.
+    _attribute_names_maxsize = 1024
+    #: Cache of :class:`~htmlwriter.TagProfile` (`{tag: profile}`), this is generated by
+    #: :class:`~htmlwriter.PreProcessor` for each class, and rebuilt when its source attribute of the class is set.
+    _tag_profiles = {}
+    #: Maximum size of :attr:`~htmlwriter.XMLWriter._tag_profiles`.
+    _tag_profiles_maxsize = 1024
+    #: Cache of begin tags of template methods without caller's attributes, this is generated by
+    #: :class:`~htmlwriter.PreProcessor` for each class, and reset with :attr:`~htmlwriter.XMLWriter._tag_profiles`
+    #: and :attr:`~htmlwriter.XMLWriter._attribute_names`.
+    _begin_tags = {}
+    #: Converters of attribute value keyed on exact type, `{type: converter(value) -> str}`. Value of other type is
+    #: converted by :meth:`~htmlwriter.XMLWriter._convert_attribute_value` and `dict` is expanded by
+    #: :meth:`~htmlwriter.XMLWriter._stringify_mapping_attribute`.
+    _attribute_value_converters = {
+        bool: lambda value: 'true' if value else 'false',
+        int: str,
+        float: str,
+        list: ' '.join,  # for `class`
+        tuple: ' '.join,
+    }
     #: See source of :meth:`~htmlwriter.XMLWriter._merge_attributes` for implementation.
     _merge_attribute_handlers = {
         # (None, 'attribute_name'): handler(old_value, new_value),
@@ -409,6 +1571,40 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
     #: Pending writing state as `context manager`. This must be not executed, execute in next
     #: :meth:`~htmlwriter.XMLWriter.write`.
     _pending = None
+    #: Deferred end of begin tag (`'>'`) or `None`. This will be written before next non-empty
+    #: :meth:`~htmlwriter.XMLWriter.write`, or replaced with `'/>'` by :meth:`~htmlwriter.XMLWriter._tag`.
+    _deferred = None
+    #: Output function of :meth:`~htmlwriter.XMLWriter.stream` or `None`.
+    _sink = None
+    #: Count of characters (bytes for :class:`~htmlwriter.BytesBuffer`) sent to :attr:`~htmlwriter.XMLWriter._sink`.
+    _flushed = 0
+    #: Buffered characters threshold of sending to sink. See :meth:`~stream`.
+    chunk_size = 8192
+    #: Output buffer class, :class:`~htmlwriter.StringIOBuffer`, :class:`~htmlwriter.ListBuffer` or
+    #: :class:`~htmlwriter.BytesBuffer`. Instance is stored in :attr:`~buffer`, it can be replaced before writing.
+    buffer_class = StringIOBuffer
+    #: Indent string of pretty printing (ex. `'  '`) or `None` (disabled). Element is written in new line with
+    #: indent while writing. Content of element that contains text or :attr:`~_inline_tags` is written in line,
+    #: and content of :attr:`~_preformatted_tags` is written as is. Whitespace of template text is collapsed.
+    indent = None
+    #: Count of entered elements in pretty printing.
+    _depth = 0
+    #: Minify mode flag. Whitespace of template text is collapsed (like :attr:`~indent`), and optional end tags,
+    #: quotes of attribute value and value of boolean attributes are omitted. See :attr:`~_optional_end_tags`,
+    #: :attr:`~_unquoted_attributes` and :attr:`~_short_boolean_attributes`.
+    minify = False
+    #: Tag name of element which end tag is held as :attr:`~_deferred` in minify mode, or `None`.
+    _held = None
+    #: Depth of element which content is written in line, or `None`. See :attr:`~indent`.
+    _inline_depth = None
+    #: Depth of outermost entered :attr:`~_preformatted_tags`, or `None`. See :attr:`~indent`.
+    _preformatted_depth = None
+    #: Profiling callback `profiler(kind, name, size, seconds)` (ex. :class:`~htmlwriter.Profile`) or `None`
+    #: (disabled). This is called on end of each tag (kind is `'tag'`) and each method call (kind is `'method'`).
+    #: Set to a writer for profiling it, or set to a class for profiling all writers of the class.
+    profiler = None
+    #: `True` after :meth:`~close`.
+    closed = False
 
     def __init__(self, *args, **root_attributes):
         """
@@ -417,7 +1613,7 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
         :param str root_tag: root tag name
         :param root_attributes: root tag attributes
         """
-        super().__init__()
+        self.buffer = self.buffer_class()
 
         assert len(args) > 0, 'no root tag'
         assert len(args) <= 2, 'too many arguments'
@@ -447,43 +1643,400 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
         """
         self.write('')  # consume self._pending
 
-        header = ''
+        if self.closed:
+            raise ValueError('I/O operation on closed writer')
+        if self._flushed:
+            raise ValueError('content was already flushed to sink')
+
+        content = self.buffer.getvalue() + self._get_deferred(self.root_tag)
+
+        if root_tag:
+            return '%s%s%s' % (self._get_prologue(declaration, doctype), content, self._get_epilogue())
+        else:
+            return content
+
+    def getbuffer(self, *, declaration: bool=True, doctype: bool=True) -> memoryview:
+        """Get the written content as encoded bytes. This is same as `getvalue().encode()`, but encoding is done on
+        writing if :attr:`~buffer` is :class:`~htmlwriter.BytesBuffer`, and no copy of whole content is made.
+
+        :param declaration: XML declaration output flag or XML declaration
+        :type declaration: bool or str
+        :param doctype: XML doctype output flag or XML doctype
+        :type doctype: bool or str
+        :return: bytes view
+        :rtype: memoryview
+
+        See :meth:`io.BytesIO.getbuffer`.
+        """
+        self.write('')  # consume self._pending
+
+        if self.closed:
+            raise ValueError('I/O operation on closed writer')
+        if self._flushed:
+            raise ValueError('content was already flushed to sink')
+
+        return self.buffer.getbuffer(
+            self._get_prologue(declaration, doctype), self._get_deferred(self.root_tag) + self._get_epilogue())
+
+    def _get_prologue(self, declaration=True, doctype=True) -> str:
+        """Get a string before content, XML declaration, doctype and begin tag of root.
+
+        :param declaration: XML declaration output flag or XML declaration
+        :type declaration: bool or str
+        :param doctype: XML doctype output flag or XML doctype
+        :type doctype: bool or str
+        :rtype: str
+        """
+        result = ''
+        newline = '' if self.minify else '\n'
 
         if declaration:
             if isinstance(declaration, str):
-                header += declaration + '\n'
+                result += declaration + newline
             elif self.declaration:
-                header += self.declaration + '\n'
+                result += self.declaration + newline
 
         if doctype:
             if isinstance(doctype, str):
-                header += doctype + '\n'
+                result += doctype + newline
             elif self.doctype:
-                header += self.doctype + '\n'
+                result += self.doctype + newline
 
-        content = super().getvalue()
+        return result + self._get_begin_tag(
+            self.root_tag, **self._merge_attributes(self.root_tag, self.root_attributes))
 
-        if root_tag:
-            return '%s%s%s</%s>' % (
-                header,
-                self._get_begin_tag(self.root_tag, **self.root_attributes),
-                content,
-                self.root_tag,
-            )
-        else:
-            return content
+    def _get_epilogue(self) -> str:
+        """Get a string after content, end tag of root.
 
-    def write(self, s: str):
+        :rtype: str
+        """
+        if self.indent is not None and self._inline_depth is None and self._tell():
+            return '\n</%s>' % (self.root_tag, )
+        return '</%s>' % (self.root_tag, )
+
+    @contextlib.contextmanager
+    def stream(self, sink, *, encoding: str=None, declaration: bool=True, doctype: bool=True, compress: str=None,
+               compresslevel: int=6):
+        """Send output to `sink` while writing instead of keeping whole content in memory.
+
+        Header and begin tag of root are sent on enter, end tag of root is sent on exit. Written content is sent
+        every :attr:`~chunk_size` characters by :meth:`~flush`.
+
+            >>> writer = XMLWriter('html')
+            >>> chunks = []
+            >>> with writer.stream(chunks.append):
+            ...     writer.tag('p', 'hello, world')
+            >>> ''.join(chunks)
+            '<html><p>hello, world</p></html>'
+
+        Compressed streaming, `head` is sent before rendering `body`:
+
+            >>> writer = HTML5Writer()
+            >>> with writer.stream(response.write, compress='gzip'):
+            ...     with writer.head:
+            ...         writer.link(rel='stylesheet', href='style.css')
+            ...     writer.flush(sync=True)
+            ...     with writer.body:
+            ...         render_body(writer)
+
+        :param sink: file like object (has `write` method) or callable, ex. file, `socket.sendall` with `encoding`,
+                     `write` callable of WSGI `start_response` with `encoding`
+        :param str encoding: encode chunks before sending if specified
+        :param declaration: XML declaration output flag or XML declaration
+        :type declaration: bool or str
+        :param doctype: XML doctype output flag or XML doctype
+        :type doctype: bool or str
+        :param str compress: `'gzip'`, `'deflate'` or `'raw'` for sending compressed chunks, or `None`.
+                             `encoding` is `'utf-8'` if not specified. See :class:`~htmlwriter.CompressedSink` and
+                             :meth:`~flush`.
+        :param int compresslevel: compression level (0-9)
+        :return: `context manager <https://docs.python.org/3/library/stdtypes.html#context-manager-types>`_
+        """
+        assert self._sink is None, 'already streaming'
+
+        send = getattr(sink, 'write', sink)
+        if compress:
+            self._sink = CompressedSink(send, compress, compresslevel, encoding or 'utf-8')
+        elif encoding:
+            self._sink = lambda s: send(s.encode(encoding))
+        else:
+            self._sink = send
+
+        try:
+            self.write('')  # consume self._pending
+            self._sink(self._get_prologue(declaration, doctype))
+            self.flush()
+
+            yield
+
+            self.write('')  # consume self._pending
+            self._release_end_tag(self.root_tag)
+            self.flush()
+            self._sink(self._get_epilogue())
+            if compress:
+                self._sink.flush(finish=True)
+
+        finally:
+            self._sink = None
+
+    async def aiter_chunks(self, render, *, encoding: str='utf-8', maxsize: int=2, executor=None, **kwargs):
+        """Render in worker thread and iterate encoded chunks asynchronously.
+
+        `render(writer)` is called in `executor` while :meth:`~stream` to a bounded queue. So rendering is paused
+        while consumer (transport) is slow, and event loop is not blocked.
+
+        Note that each response in flight holds one thread of `executor` until it's consumed or closed, including the
+        time that a slow client applies back-pressure. The default executor of event loop is shared with other
+        `run_in_executor` users and has few threads, so give a dedicated executor to serve many clients:
+
+            >>> render_executor = concurrent.futures.ThreadPoolExecutor(max_workers=64)
+            >>> async for chunk in writer.aiter_chunks(render_page, executor=render_executor):
+            ...     ...
+
+            >>> async def app(scope, receive, send):
+            ...     writer = HTML5Writer()
+            ...     await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+            ...     async for chunk in writer.aiter_chunks(render_page):
+            ...         await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            ...     await send({'type': 'http.response.body', 'body': b''})
+
+        :param render: callable that writes content to writer
+        :param str encoding: encoding of chunks
+        :param int maxsize: maximum count of chunks that are rendered but not consumed
+        :param executor: :class:`concurrent.futures.Executor` for rendering or `None` (default executor of running
+                         event loop)
+        :param kwargs: keyword arguments for :meth:`~stream`
+        :return: `asynchronous iterator` of `bytes`
+        """
+        import asyncio  # NOTE: importing asyncio is slow, so import on demand
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize)
+        closed = threading.Event()
+
+        def send(chunk):
+            if closed.is_set():
+                raise ConnectionAbortedError('consumer is closed')
+            asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+
+        def produce():
+            with self.stream(send, encoding=encoding, **kwargs):
+                render(self)
+
+        task = loop.run_in_executor(executor, produce)
+        get = None
+
+        try:
+            while True:
+                get = asyncio.ensure_future(queue.get())
+                await asyncio.wait((get, task), return_when=asyncio.FIRST_COMPLETED)
+
+                if get.done():
+                    yield get.result()
+                    continue
+
+                get.cancel()
+                while not queue.empty():
+                    yield queue.get_nowait()
+                task.result()  # raise exception in `render`
+                return
+
+        finally:
+            # unblock and stop producer
+            if get is not None:
+                get.cancel()
+            closed.set()
+            while not task.done():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.wait((task, ), timeout=0.01)
+            if not task.cancelled():
+                task.exception()  # mark as retrieved
+
+    def flush(self, sync: bool=False):
+        """Send buffered content to sink of :meth:`~stream`. Do nothing if not streaming.
+
+        :param bool sync: also send compressed data of written content if `compress` of :meth:`~stream` is
+                          specified, so receiver can process it before the rest (ex. after "</head>", browser can
+                          start fetching assets)
+
+        See :meth:`io.IOBase.flush`.
+        """
+        if self._sink is not None:
+            if sync:
+                self.write('')  # consume self._pending
+            size = len(self.buffer)
+            if size:
+                self._flushed += size
+                self._sink(self.buffer.drain())
+            if sync and isinstance(self._sink, CompressedSink):
+                self._sink.flush()
+
+    def _tell(self) -> int:
+        # count of written characters (bytes for `BytesBuffer`) including flushed and deferred ones
+        if self._deferred:
+            return self._flushed + len(self.buffer) + len(self._deferred)
+        return self._flushed + len(self.buffer)
+
+    def write(self, s: str) -> int:
         """Write text with no escaping.
 
-        See :meth:`io.StringIO.getvalue`.
+        :param str s: text
+        :return: count of characters of `s`
+        :rtype: int
+
+        See :meth:`io.StringIO.write`.
         """
         # execute pending `context manager`
         if self._pending:
             with self._pending:
                 pass
             # NOTE: required explicit clearing at top of `context manager` (`self._pending = None`)
-        return super().write(s)
+        if self._deferred and s:
+            self.buffer.write(self._deferred)
+            self._deferred = None
+        self.buffer.write(s)
+        if self._sink is not None and len(self.buffer) >= self.chunk_size:
+            self.flush()
+        return len(s)
+
+    def writelines(self, lines):
+        """Write texts with no escaping. See :meth:`io.IOBase.writelines`.
+
+        :param lines: iterable of text
+        """
+        for s in lines:
+            self.write(s)
+
+    def tell(self) -> int:
+        """Get count of written characters (bytes for :class:`~htmlwriter.BytesBuffer`) including flushed ones. See
+        :meth:`io.StringIO.tell`.
+
+        :rtype: int
+        """
+        self.write('')  # consume self._pending
+        return self._tell()
+
+    def close(self):
+        """Discard the written content, :meth:`~getvalue` and :meth:`~getbuffer` can't be called after closing. See
+        :meth:`io.IOBase.close`.
+        """
+        self.closed = True
+        self.buffer.drain()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _layout_enter(self, tag: str):
+        """Enter a tag in pretty printing or minify mode, this is called before begin tag. See :attr:`~indent` and
+        :attr:`~minify`.
+
+        :param str tag: tag name
+        """
+        if self._pending:
+            self.write('')  # consume self._pending, it's previous sibling
+        held = self._held
+        if held is not None:
+            self._held = None
+            if self._deferred and tag in self._optional_end_tags[held][0]:
+                self._deferred = None  # omit end tag of previous sibling
+
+        depth = self._depth = self._depth + 1
+
+        if self._inline_depth is None:
+            if tag in self._inline_tags:
+                self._inline_depth = depth - 1
+            else:
+                if self.indent is not None:
+                    self.write('\n' + self.indent * depth)
+                if tag in self._preformatted_tags:
+                    self._inline_depth = depth
+
+        if self._preformatted_depth is None and tag in self._preformatted_tags:
+            self._preformatted_depth = depth
+
+    def _layout_exit(self, tag: str):
+        """Exit a tag in pretty printing or minify mode, this is called before end tag. See :attr:`~indent` and
+        :attr:`~minify`.
+
+        :param str tag: tag name
+        """
+        if self._pending:
+            self.write('')  # consume self._pending
+        if self._held is not None:
+            self._release_end_tag(tag)
+        depth = self._depth
+        self._depth = depth - 1
+
+        if self._preformatted_depth == depth:
+            self._preformatted_depth = None
+
+        if self._inline_depth is None:
+            if self.indent is not None and not self._deferred:  # not empty element
+                self.write('\n' + self.indent * depth)
+        elif self._inline_depth == depth:
+            self._inline_depth = None
+
+    def _hold_end_tag(self, tag: str):
+        """Write end tag of :attr:`~_optional_end_tags` as :attr:`~_deferred` in minify mode. It is omitted by
+        :meth:`~_layout_enter` or :meth:`~_release_end_tag` if next output allows it.
+
+        :param str tag: tag name
+        """
+        if self._deferred:  # empty element
+            self._deferred = None
+            self.write('>')
+        self._deferred = (self._tag_profiles.get(tag) or self._get_tag_profile(tag)).end_tag
+        self._held = tag
+
+    def _release_end_tag(self, parent: str):
+        """Omit or write held end tag (see :meth:`~_hold_end_tag`) at the end of parent element.
+
+        :param str parent: tag name of parent element
+        """
+        held = self._held
+        if held is not None:
+            self._held = None
+            if self._deferred:
+                excludes = self._optional_end_tags[held][1]
+                if excludes is None or parent in excludes:
+                    deferred, self._deferred = self._deferred, None
+                    self.write(deferred)
+                else:
+                    self._deferred = None
+
+    def _get_deferred(self, parent: str) -> str:
+        """Get :attr:`~_deferred` as if parent element ends now, held end tag is omitted like
+        :meth:`~_release_end_tag`. This doesn't change state of writer, so writing can be continued.
+
+        :param str parent: tag name of parent element
+        :rtype: str
+        """
+        deferred = self._deferred
+        if not deferred:
+            return ''
+        if self._held is not None:
+            excludes = self._optional_end_tags[self._held][1]
+            if excludes is not None and parent not in excludes:
+                return ''
+        return deferred
+
+    def _write_template_text(self, s: str):
+        """Write static text of template in pretty printing or minify mode. See :attr:`~indent` and :attr:`~minify`.
+
+        :param str s: text
+        """
+        if self._preformatted_depth is None:
+            if self._inline_depth is None:
+                s = s.lstrip()
+                if not s:
+                    return
+                self._inline_depth = self._depth
+            s = _collapse_whitespace(' ', s)
+        self.write(s)
 
     def _merge_attributes(self, tag: str, *args) -> dict:
         """Merge and rename attributes.
@@ -495,40 +2048,75 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
         :rtype: dict
         """
         result = {}
+        names = self._attribute_names
+        handlers = (self._tag_profiles.get(tag) or self._get_tag_profile(tag)).merge_handlers
 
         for attributes in args:
-            assert isinstance(attributes, collections.Mapping)
+            assert isinstance(attributes, collections.abc.Mapping)
 
             for name, value in attributes.items():
                 # do renaming
-                for pattern, repl in self._attribute_rename_patterns:
-                    name = re.sub(pattern, repl, name)
+                try:
+                    name = names[name]
+                except KeyError:
+                    name = self._rename_attribute(name)
 
-                if name in result:
+                if name in result and name in handlers:
                     # call merge handler
-                    if (tag, name) in self._merge_attribute_handlers:
-                        result[name] = self._merge_attribute_handlers[tag, name](result[name], value)
-                    elif (None, name) in self._merge_attribute_handlers:
-                        result[name] = self._merge_attribute_handlers[None, name](result[name], value)
-                    else:
-                        result[name] = value
+                    result[name] = handlers[name](result[name], value)
                 else:
                     result[name] = value
 
         return result
 
+    @classmethod
+    def _get_tag_profile(cls, tag: str) -> TagProfile:
+        """Get :class:`~htmlwriter.TagProfile` of tag and store result to
+        :attr:`~htmlwriter.XMLWriter._tag_profiles`. Profile is made from class attributes, so instance attributes
+        don't affect it.
+
+        :param str tag: tag name
+        :rtype: TagProfile
+        """
+        result = cls._tag_profiles.get(tag)
+
+        if result is None:
+            result = TagProfile(cls, tag)
+            if len(cls._tag_profiles) < cls._tag_profiles_maxsize:
+                cls._tag_profiles[tag] = result
+
+        return result
+
+    @classmethod
+    def _rename_attribute(cls, name: str) -> str:
+        """Rename attribute by :attr:`~htmlwriter.XMLWriter._attribute_rename_patterns` and store result to
+        :attr:`~htmlwriter.XMLWriter._attribute_names`.
+
+        :param str name: attribute name
+        :return: renamed attribute name
+        :rtype: str
+        """
+        result = name
+
+        for pattern, repl in cls._compiled_attribute_rename_patterns:
+            result = pattern.sub(repl, result)
+
+        if len(cls._attribute_names) < cls._attribute_names_maxsize:
+            cls._attribute_names[name] = result
+
+        return result
+
     def _get_begin_tag(self, tag: str, **attributes) -> str:
         """Get a string of begin tag.
 
         :param str tag: tag name
-        :param attributes: tag attributes
+        :param attributes: tag attributes, these must be renamed and merged by
+                           :meth:`~htmlwriter.XMLWriter._merge_attributes`
         :return: '<tag ...>' or '<tag>' if attributes are empty
         :rtype: str
         """
         result = ''
 
-        attributes = self._merge_attributes(tag, attributes)  # do renaming and merging
-
         for name, value in attributes.items():
             s = self._stringify_attribute(tag, name, value)
             if s:
@@ -545,39 +2133,85 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
         :return: representation string for embedding begin tag
         :rtype: str
         """
-        if (tag, name) in self._boolean_attributes or (None, name) in self._boolean_attributes:
+        if name in (self._tag_profiles.get(tag) or self._get_tag_profile(tag)).boolean_attributes:
             if value:
                 return name
 
+        elif self.minify and name in self._short_boolean_attributes and (value is True or value in ('', name)):
+            return name
+
         else:
-            if isinstance(value, str):
-                pass
+            if type(value) is not str:
+                converter = self._attribute_value_converters.get(type(value))
+                if converter is not None:
+                    value = converter(value)
+                elif isinstance(value, collections.abc.Mapping):
+                    return self._stringify_mapping_attribute(tag, name, value)
+                else:
+                    value = self._convert_attribute_value(value)
 
-            elif isinstance(value, bytes):
-                raise TypeError('not supported %r' % (value, ))
+            if self.minify and self._unquoted_attributes:
+                if not value:
+                    return name
+                if not _unsafe_unquoted_attribute(value):
+                    return '%s=%s' % (name, value.replace('&', '&amp;'))
 
-            elif isinstance(value, bool):
-                value = 'true' if value else 'false'
+            if not _attribute_special(value):
+                return name + '="' + value + '"'
+            return name + '=' + quote_attribute(value)
 
-            elif isinstance(value, (int, float)):
-                value = str(value)
+        return ''
 
-            elif isinstance(value, collections.Mapping):
-                # TODO: dict attribute
-                # http://api.jquery.com/data/
-                raise NotImplementedError('value as dict is not supported')
+    def _stringify_mapping_attribute(self, tag: str, name: str, value) -> str:
+        """Get a string of attributes expanded from `dict` value like `jQuery.data()
+        <http://api.jquery.com/data/>`_, ex. `data={'id': 1, 'user_name': 'a'}` is `data-id="1" data-user-name="a"`.
+        Item of `dict`, `list` or `tuple` is written as JSON, and item of `None` is skipped.
 
-            elif isinstance(value, collections.Iterable):  # for `class`
-                value = ' '.join(value)
+        :param str tag: tag name
+        :param str name: attribute name, prefix of expanded attributes
+        :param value: attribute value
+        :type value: collections.abc.Mapping
+        :return: representation string for embedding begin tag
+        :rtype: str
+        """
+        result = []
 
-            else:
-                value = str(value)
+        for key, item in value.items():
+            if item is None:
+                continue
+            if isinstance(item, (collections.abc.Mapping, list, tuple)):
+                item = json.dumps(item, separators=(',', ':'))
+            s = self._stringify_attribute(tag, name + '-' + str(key).replace('_', '-'), item)
+            if s:
+                result.append(s)
 
-            return '%s=%s' % (name, xml.sax.saxutils.quoteattr(value))
+        return ' '.join(result)
 
-        return ''
+    @staticmethod
+    def _convert_attribute_value(value) -> str:
+        """Convert attribute value which type isn't in :attr:`~htmlwriter.XMLWriter._attribute_value_converters`.
+
+        :param value: attribute value
+        :return: attribute value string
+        :rtype: str
+        """
+        if isinstance(value, str):
+            return value
+
+        elif isinstance(value, bytes):
+            raise TypeError('not supported %r' % (value, ))
+
+        elif isinstance(value, bool):
+            return 'true' if value else 'false'
+
+        elif isinstance(value, (int, float)):
+            return str(value)
+
+        elif isinstance(value, collections.abc.Iterable):  # for `class`
+            return ' '.join(value)
+
+        return str(value)
 
-    @contextlib.contextmanager
     def _tag(self, *args, **attributes):
         """Non wrapped version of :meth:`~htmlwriter.XMLWriter.tag`. Don't call this function directly. This function
         doesn't register and cleanup :attr:`~htmlwriter.XMLWriter._pending`.
@@ -596,25 +2230,19 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
             tag, content = args
         assert isinstance(tag, str) and tag, 'not expected: %s' % (tag, )
 
-        self.write(self._get_begin_tag(tag, **attributes))
-        if content:
-            self.text(content)
+        return self._element(tag, self._get_begin_tag(tag, **self._merge_attributes(tag, attributes)), content)
 
-        wrote = self.tell()
+    def _element(self, tag: str, begin_tag: str, content=None):
+        """Write or enter a tag with rendered begin tag. See :meth:`~htmlwriter.XMLWriter._tag`.
 
-        yield
-
-        if not content and wrote == self.tell() and self._pending is None:
-            if tag in self._no_end_tags:
-                pass
-            elif self._require_end_tags is True or tag in self._require_end_tags:
-                self.write('</%s>' % (tag, ))
-            else:
-                self.seek(self.tell() - 1)
-                self.write('/>')
-        else:
-            assert tag not in self._no_end_tags, '"%s" tag cannot contain content' % (tag, )
-            self.write('</%s>' % (tag, ))
+        :param str tag: tag name
+        :param str begin_tag: begin tag string, return value of :meth:`~htmlwriter.XMLWriter._get_begin_tag`
+        :param str content: text content, this will be written by :meth:`~htmlwriter.XMLWriter.text`
+        :return: `context manager <https://docs.python.org/3/library/stdtypes.html#context-manager-types>`_
+        """
+        if self.profiler is None:
+            return ElementContext(self, tag, begin_tag, content)
+        return ProfileElementContext(self, tag, begin_tag, content)
 
     tag = TagMethodHelper(_tag)
     tag.__doc__ = """Write or enter a tag.
@@ -628,26 +2256,23 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
     def text(self, s: str):
         """Write text with escaping '<' and '>'.
         """
+        if (self.minify or self.indent is not None) and self._inline_depth is None and s != '':
+            self._inline_depth = self._depth
+
         if hasattr(s, '__html__'):
             return self.write(s.__html__())
 
         if not isinstance(s, str):
             s = str(s)
 
-        mapping = {
-            # ' ': '&nbsp;',
-            '&': '&amp;',
-            '>': '&gt;',
-            '<': '&lt;',
-        }
-        # s = re.sub('&(?!#[0-9]{1,4};|[A-Za-z]+;)|<|>| ', lambda m: mapping[m.group(0)], s)
-        s = re.sub('&(?!#[0-9]{1,4};|[A-Za-z]+;)|<|>', lambda m: mapping[m.group(0)], s)
-        return self.write(s)
+        return self.write(escape_text(s))
 
     def comment(self, s: str):
         """Write comment.
         """
         # assert '-->' not in s
+        if self.indent is not None and self._inline_depth is None:
+            self.write('\n' + self.indent * (self._depth + 1))
         self.write('<!--%s-->' % (etree._escape_cdata(s), ))
 
     def cdata(self, s: str):
@@ -670,79 +2295,137 @@ class XMLWriter(StringIO, metaclass=PreProcessor):
         self.write('?>')
 
 
-# TODO: html pretty printing (like: etree._serialize['html'] = etree._serialize_html, etree.tostring(*, method='html'))
+def canonicalize_element(e: etree.Element, type: str=None) -> tuple:
+    """Get canonical form of element for :meth:`~htmlwriter.XmlTestCase.assertXmlEqual`.
+
+    Element is represented as tuple `(tag, attributes, text, tail, children)`. Whitespace around text is stripped,
+    attributes are sorted, `class` attribute of HTML is sorted set of class names, and comments are removed. So
+    canonical forms are equal if documents are same without whitespace and class order.
+
+    :param Element e: source element
+    :param str type: document type, `'html'` or others, default is root tag name
+    :rtype: tuple
+    """
+    if type is None:
+        type = re.sub(r'^\{.+\}', '', e.tag.lower())
+    html = type == 'html'
+    comment = etree.Comment
+
+    def canonicalize(e):
+        attributes = ()
+        if e.attrib:
+            attributes = []
+            for name, value in e.attrib.items():
+                if html and name == 'class':
+                    value = ' '.join(sorted(set(value.split())))
+                    if not value:
+                        continue
+                else:
+                    value = value.strip()
+                attributes.append((name, value))
+            attributes.sort()
+            attributes = tuple(attributes)
+
+        return (e.tag, attributes, e.text.strip() if e.text else '', e.tail.strip() if e.tail else '',
+                tuple([canonicalize(i) for i in e if i.tag is not comment]))
+
+    return canonicalize(e)
+
+
+@functools.lru_cache(maxsize=1024)
+def canonicalize_xml(data: str, type: str=None) -> tuple:
+    """Get canonical form of XML string, see :func:`~htmlwriter.canonicalize_element`. Result is cached.
+
+    :param str data: XML string
+    :param str type: document type, `'html'` or others, default is root tag name
+    :rtype: tuple
+    """
+    return canonicalize_element(parse_xml(data), type)
 
 
 class XmlTestCase(unittest.TestCase):
 
     def assertXmlEqual(self, first, second, msg=None, type=None):
+        """Fail if two XML are not same without whitespace and class order of HTML. Parsed XML strings are cached.
+
+        :param first: XML string or :class:`xml.etree.ElementTree.Element`
+        :param second: XML string or :class:`xml.etree.ElementTree.Element`
+        :param msg: message on failure
+        :param str type: document type, `'html'` or others, default is root tag name of `first`
+        """
         # https://github.com/formencode/formencode/blob/master/formencode/doctest_xml_compare.py
-        # def parse(data):
-        #     class Element(etree.Element):
-        #         doctype = None
-        #
-        #     class TreeBuilder(etree.TreeBuilder):
-        #         doctype = None
-        #
-        #         def doctype(self, name, pubid, system):
-        #             self.doctype = name, pubid, system
-        #
-        #         def close(self):
-        #             result = super().close()
-        #             # result.doctype = self.doctype
-        #             return result
-        #
-        #     parser = etree.XMLParser(target=TreeBuilder(Element))
-        #     parser.entity['amp'] = '&'
-        #     parser.feed(re.sub('&([A-Za-z0-9]+);', '&amp;\\1;', data))
-        #     return parser.close()
-
-        def element(x):
+        def canonicalize(x, type):
             if isinstance(x, str):
-                x = parse_xml(x)
+                return canonicalize_xml(x, type)
             self.assertIsInstance(x, etree.Element)
-            return x
+            return canonicalize_element(x, type)
 
-        first = element(first)
-        second = element(second)
+        # NOTE: type of `second` is also determined by its root tag if `type` is `None`, it's same as `first` unless
+        #       root tags are different
+        first = canonicalize(first, type)
+        second = canonicalize(second, type)
 
-        self.assertEqual(first.tag, second.tag)
-        # self.assertEqual(getattr(first, 'doctype', None), getattr(second, 'doctype', None))
+        if first != second:
+            path, a, b = self._xml_difference(first, second, '/' + first[0]) or \
+                ('/%s/tail()' % (first[0], ), first[3], second[3])
+            self.fail(self._formatMessage(msg, '%s: %r != %r' % (path, a, b)))
 
-        if type is None:
-            type = re.sub('^\{.+\}', '', first.tag.lower())
+    @classmethod
+    def _xml_difference(cls, first: tuple, second: tuple, path: str) -> tuple:
+        """Find the first difference of canonical forms except tail of root.
+
+        :param tuple first: canonical form, see :func:`~htmlwriter.canonicalize_element`
+        :param tuple second: canonical form
+        :param str path: path of `first` and `second`
+        :return: `(path, first_value, second_value)` or `None`
+        :rtype: tuple
+        """
+        if first[0] != second[0]:
+            return path, first[0], second[0]
 
-        for a, b in ((first.attrib, second.attrib), (second.attrib, first.attrib)):
-            for name, value in a.items():
-                if type == 'html' and name == 'class':
-                    self.assertSetEqual(set(value.split()), set(b.get(name, '').split()))
-                else:
-                    self.assertIn(name, b)
-                    self.assertEqual(value.strip(), b[name].strip())
-        # self.assertSetEqual(set(first.attrib), set(second.attrib))
-        # for name, value in first.attrib.items():
-        #     if type == 'html' and name == 'class':
-        #         self.assertSetEqual(set(value.split()), set(second.attrib[name].split()))
-        #     else:
-        #         self.assertEqual(value.strip(), second.attrib[name].strip())
+        a = dict(first[1])
+        b = dict(second[1])
+        for name in sorted(set(a) | set(b)):
+            if a.get(name) != b.get(name):
+                return '%s/@%s' % (path, name), a.get(name), b.get(name)
+
+        if first[2] != second[2]:
+            return path + '/text()', first[2], second[2]
+
+        for index, (i, j) in enumerate(zip(first[4], second[4])):
+            result = cls._xml_difference(i, j, '%s/%s[%d]' % (path, i[0], index))
+            if result:
+                return result
+            if i[3] != j[3]:
+                return '%s/%s[%d]/tail()' % (path, i[0], index), i[3], j[3]
+
+        if len(first[4]) != len(second[4]):
+            return path + '/*', [i[0] for i in first[4]], [i[0] for i in second[4]]
+
+
+@functools.lru_cache(maxsize=1024)
+def _merge_class_strings(first: str, second: str) -> str:
+    """Cached :func:`~htmlwriter.merge_class` for two `str`, mostly template default and caller's class."""
+    return ' '.join(dict.fromkeys(first.split() + second.split()))
 
-        self.assertMultiLineEqual((first.text or '').strip(), (second.text or '').strip())
-        self.assertMultiLineEqual((first.tail or '').strip(), (second.tail or '').strip())
 
-        first = [i for i in first if i.tag is not etree.Comment]
-        second = [i for i in second if i.tag is not etree.Comment]
-        self.assertEqual(len(first), len(second))
-        for i, j in zip(first, second):
-            self.assertXmlEqual(i, j, msg=msg, type=type)
+def merge_class(*classes) -> str:
+    """Merge values of `class` attribute. Order of class names is kept and duplicates are removed, so result is
+    same in every process.
 
+    :param classes: space separated class names or iterable of class names
+    :return: space separated class names
+    :rtype: str
+    """
+    if len(classes) == 2 and type(classes[0]) is str and type(classes[1]) is str:
+        return _merge_class_strings(*classes)
 
-def merge_class(*classes):
-    result = set()
+    result = {}
 
     for class_ in classes:
-        result.update(class_.split() if isinstance(class_, str) else class_)
+        result.update(dict.fromkeys(class_.split() if isinstance(class_, str) else class_))
 
-    return result
+    return ' '.join(result)
 
 
 class HTMLWriter(XMLWriter):
@@ -863,6 +2546,18 @@ class HTMLWriter(XMLWriter):
         'span',
         'div',
     }
+    _inline_tags = {
+        'a', 'abbr', 'acronym', 'audio', 'b', 'bdi', 'bdo', 'big', 'br', 'button', 'canvas', 'cite', 'code', 'data',
+        'del', 'dfn', 'em', 'embed', 'font', 'i', 'iframe', 'img', 'input', 'ins', 'kbd', 'label', 'map', 'mark',
+        'meter', 'object', 'output', 'picture', 'progress', 'q', 's', 'samp', 'select', 'small', 'span', 'strike',
+        'strong', 'sub', 'sup', 'textarea', 'time', 'tt', 'u', 'var', 'video', 'wbr',
+    }
+    _preformatted_tags = {
+        'pre',
+        'textarea',
+        'script',
+        'style',
+    }
     _attribute_rename_patterns = XMLWriter._attribute_rename_patterns + (
         ('^class_$', 'class'),
     )
@@ -1026,6 +2721,33 @@ class HTML5Writer(HTMLWriter):
     _attribute_rename_patterns = HTMLWriter._attribute_rename_patterns + (
         ('^(data|aria)_(.+)', lambda m: m.group(0).replace('_', '-')),
     )
+    # https://html.spec.whatwg.org/multipage/syntax.html#optional-tags
+    _optional_end_tags = {
+        'li': ({'li'}, set()),
+        'dt': ({'dt', 'dd'}, None),
+        'dd': ({'dt', 'dd'}, set()),
+        'p': ({
+            'address', 'article', 'aside', 'blockquote', 'details', 'dialog', 'div', 'dl', 'fieldset', 'figcaption',
+            'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hgroup', 'hr', 'main', 'menu',
+            'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul',
+        }, {'a', 'audio', 'del', 'ins', 'map', 'noscript', 'video'}),
+        'rt': ({'rt', 'rp'}, set()),
+        'rp': ({'rt', 'rp'}, set()),
+        'optgroup': ({'optgroup'}, set()),
+        'option': ({'option', 'optgroup'}, set()),
+        'thead': ({'tbody', 'tfoot'}, None),
+        'tbody': ({'tbody', 'tfoot'}, set()),
+        'tfoot': (set(), set()),
+        'tr': ({'tr'}, set()),
+        'td': ({'td', 'th'}, set()),
+        'th': ({'td', 'th'}, set()),
+    }
+    _short_boolean_attributes = {
+        'allowfullscreen', 'async', 'autofocus', 'autoplay', 'checked', 'controls', 'default', 'defer', 'disabled',
+        'formnovalidate', 'hidden', 'inert', 'ismap', 'itemscope', 'loop', 'multiple', 'muted', 'nomodule',
+        'novalidate', 'open', 'playsinline', 'readonly', 'required', 'reversed', 'selected',
+    }
+    _unquoted_attributes = True
 
     def __init__(self, **root_attributes):
         """
@@ -1045,7 +2767,7 @@ class Bootstrap3Writer(HTML5Writer):
         """
         return self.span(**self._merge_attributes(
             'span',
-            dict(class_={'glyphicon', 'glyphicon-%s' % (name, )}, aria_hidden=True),
+            dict(class_='glyphicon glyphicon-%s' % (name, ), aria_hidden=True),
             attributes))
 
     _template = '''<template prefix="bs_">
@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from htmlwriter import XmlTestCase, HTML5Writer, Bootstrap3Writer
+import asyncio
+import concurrent.futures
+import io
+import json
+import os
+import pickle
+import tempfile
+import zlib
+from unittest.mock import patch
+from htmlwriter import XmlTestCase, PreProcessor, XMLWriter, HTML5Writer, Bootstrap3Writer, ListBuffer, BytesBuffer, \
+    escape_text, escape_texts, Profile, parse_xml, iterparse_xml, merge_class, quote_attribute
 
 
 class Test(XmlTestCase):
@@ -33,6 +43,16 @@ class Test(XmlTestCase):
             </html>
         ''')
 
+    def test_escape_references(self):
+        source = 'a &amp; b & c &#123; &#12345; &x <d> &amp\0;'
+        expected = 'a &amp; b &amp; c &#123; &amp;#12345; &amp;x &lt;d&gt; &amp;amp\0;'
+        self.assertEqual(escape_text(source), expected)
+        self.assertEqual(escape_texts([source, 1, '&amp', ';']), [expected, '1', '&amp;amp', ';'])
+
+        h = HTML5Writer()
+        h.text(source)
+        self.assertEqual(h.getvalue(root_tag=False), expected)
+
     def test_nested_with(self):
         h = HTML5Writer()
         with h.body, h.main:
@@ -49,6 +69,32 @@ class Test(XmlTestCase):
             </html>
         ''')
 
+    def test_nested_same_tag(self):
+        h = HTML5Writer()
+        self.assertIs(h.div, h.div)
+        with h.body, h.div, h.div:
+            h.p('hello, world')
+
+        self.assertXmlEqual(h.getvalue(), '''
+            <!DOCTYPE html>
+            <html>
+                <body>
+                    <div><div><p>hello, world</p></div></div>
+                </body>
+            </html>
+        ''')
+
+    def test_override_method(self):
+        class CustomWriter(HTML5Writer):
+            def p(self, *args, **kwargs):
+                kwargs.setdefault('class_', 'lead')
+                return super().p(*args, **kwargs)
+
+        h = CustomWriter()
+        h.p('one')
+        h.p('two')
+        self.assertEqual(h.getvalue(root_tag=False), '<p class="lead">one</p><p class="lead">two</p>')
+
     def test_rewrite_attributes(self):
         h = HTML5Writer()
         with h.body:
@@ -191,3 +237,485 @@ class Test(XmlTestCase):
                 </body>
             </html>
         ''')
+
+    def test_inherited_template(self):
+        class CustomWriter(Bootstrap3Writer):
+            pass
+
+        class SameTemplateWriter(HTML5Writer):
+            _template = Bootstrap3Writer._template
+
+        h = CustomWriter()
+        h.bs_row()
+        self.assertNotIn('bs_row', vars(CustomWriter))
+        self.assertIs(SameTemplateWriter.bs_row, Bootstrap3Writer.bs_row)
+        self.assertEqual(h.getvalue(root_tag=False), '<div class="row"></div>')
+
+    def test_template_text(self):
+        class CustomWriter(HTML5Writer):
+            _template = '<template><note><b class="x">Tom &amp; Jerry &lt;3&nbsp;&amp;nbsp;</b>' \
+                        '<template-yield/><template-content>&amp;</template-content></note>' \
+                        '<memo>&amp;nbsp;&nbsp;</memo></template>'
+
+        h = CustomWriter()
+        h.note()
+        h.note()
+        self.assertEqual(h.getvalue(root_tag=False),
+                         '<note><b class="x">Tom &amp; Jerry &lt;3&nbsp;&amp;nbsp;</b>&amp;</note>' * 2)
+
+        # '&amp;nbsp;' is not an entity reference in default content of shallow template
+        h = CustomWriter()
+        h.memo()
+        self.assertEqual(h.getvalue(root_tag=False), '<memo>&amp;nbsp;&nbsp;</memo>')
+
+        # static begin tags are cached for each mode
+        h = CustomWriter()
+        h.minify = True
+        h.note()
+        self.assertEqual(h.getvalue(root_tag=False),
+                         '<note><b class=x>Tom &amp; Jerry &lt;3&nbsp;&amp;nbsp;</b>&amp;</note>')
+
+    def test_lazy_template(self):
+        # NOTE: methods of same template string are shared, so template is unique for each test case
+        template = '<template><span class="lazynote" title="%s">text</span></template>' % (self.__class__.__name__, )
+
+        def make():
+            class CustomWriter(HTML5Writer):
+                _template = template
+            return CustomWriter
+
+        CustomWriter = make()
+        self.assertFalse(CustomWriter.__dict__['_template_compiled'])
+        self.assertNotIn('lazynote', vars(CustomWriter))
+        CustomWriter()
+        self.assertTrue(CustomWriter.__dict__['_template_compiled'])
+
+        CustomWriter = make()
+        self.assertTrue(hasattr(CustomWriter, 'lazynote'))
+        self.assertTrue(CustomWriter.__dict__['_template_compiled'])
+
+        CustomWriter = make()
+        self.assertIn('lazynote', dir(CustomWriter))
+        self.assertTrue(CustomWriter.__dict__['_template_compiled'])
+
+        method = CustomWriter.__dict__['lazynote']
+        self.assertIsNone(vars(method)['_doc'])  # document is generated on demand
+        self.assertIn('<span class="lazynote" title="%s">text</span>' % (self.__class__.__name__, ), method.__doc__)
+        self.assertIs(vars(method)['_doc'], method.__doc__)
+
+    def test_template_cache(self):
+        template = Bootstrap3Writer._template
+
+        with tempfile.TemporaryDirectory() as cache_dir, patch.object(PreProcessor, 'cache_dir', cache_dir):
+            self.assertIsNone(PreProcessor.read_cache(template))
+            methods = dict(PreProcessor.make_methods(template))
+            self.assertTrue(os.path.exists(PreProcessor.get_cache_path(template)))
+
+            with patch.object(PreProcessor, 'compile_entries', side_effect=AssertionError('not cached')):
+                cached = dict(PreProcessor.make_methods(template))
+            self.assertEqual(sorted(cached), sorted(methods))
+            self.assertEqual(cached['bs_menuitem'].__doc__, methods['bs_menuitem'].__doc__)
+
+            # cache file is JSON, handlers are rebuilt from patterns
+            with open(PreProcessor.get_cache_path(template), encoding='utf-8') as f:
+                self.assertEqual(json.load(f)[1], template)
+            entries = PreProcessor.read_cache(template)
+            compiled = PreProcessor.compile_entries(template)
+            self.assertEqual(repr([i[:3] for i in entries]), repr([i[:3] for i in compiled]))
+            self.assertIn("AttributeClassMap('active, disabled')", repr(entries))
+
+            # broken cache is ignored
+            with open(PreProcessor.get_cache_path(template), 'wb') as f:
+                f.write(b'broken')
+            self.assertIsNone(PreProcessor.read_cache(template))
+
+    def test_tag_profiles(self):
+        class CustomWriter(HTML5Writer):
+            _no_end_tags = HTML5Writer._no_end_tags | {'custom'}
+
+        class SubWriter(CustomWriter):
+            pass
+
+        self.assertTrue(CustomWriter._get_tag_profile('custom').void)
+        self.assertFalse(HTML5Writer._get_tag_profile('custom').void)
+        self.assertEqual(HTML5Writer._get_tag_profile('input').boolean_attributes,
+                         {'checked', 'required', 'multiple', 'disabled', 'readonly'})
+
+        h = SubWriter()
+        h.tag('custom')
+        CustomWriter._boolean_attributes = HTML5Writer._boolean_attributes | {('custom', 'hidden')}
+        h.tag('custom', hidden=True)
+        h.br(hidden=True)
+        self.assertEqual(h.getvalue(root_tag=False), '<custom><custom hidden><br hidden="true">')
+
+        # cache of template methods is reset
+        class CustomWriter(Bootstrap3Writer):
+            pass
+
+        h = CustomWriter()
+        h.bs_btn_primary('a')
+        self.assertEqual(h.getvalue(root_tag=False), '<button type="button" class="btn btn-primary">a</button>')
+        CustomWriter._boolean_attributes = CustomWriter._boolean_attributes | {('button', 'type')}
+        h.bs_btn_primary('b')
+        h.bs_btn_primary('c', id='x')
+        self.assertEqual(h.getvalue(root_tag=False), '<button type="button" class="btn btn-primary">a</button>'
+                                                     '<button type class="btn btn-primary">b</button>'
+                                                     '<button type class="btn btn-primary" id="x">c</button>')
+
+        # attribute renaming is rebuilt
+        class SubWriter(CustomWriter):
+            pass
+
+        h = SubWriter()
+        h.div(foo=1)
+        self.assertEqual(h.getvalue(root_tag=False), '<div foo="1"></div>')
+        CustomWriter._attribute_rename_patterns = CustomWriter._attribute_rename_patterns + (('^foo$', 'bar'), )
+        h.div(foo=1)
+        self.assertEqual(h.getvalue(root_tag=False), '<div foo="1"></div><div bar="1"></div>')
+
+    def test_attribute_values(self):
+        self.assertEqual(quote_attribute('a'), '"a"')
+        self.assertEqual(quote_attribute('a & "b"'), '\'a &amp; "b"\'')
+        self.assertEqual(quote_attribute('\'a\'\n"b"'), '"\'a\'&#10;&quot;b&quot;"')
+
+        h = HTML5Writer()
+        h.div(data={'id': 1, 'user_name': '<a>', 'options': {'x': [1, 2]}, 'none': None, 'on': True},
+              title=1.5, class_=('a', 'b'))
+        self.assertEqual(h.getvalue(root_tag=False),
+                         '<div data-id="1" data-user-name="&lt;a&gt;" data-options=\'{"x":[1,2]}\' data-on="true"'
+                         ' title="1.5" class="a b"></div>')
+        with self.assertRaises(TypeError):
+            h.div(title=b'bytes')
+            h.getvalue()
+
+    def test_merge_class(self):
+        self.assertEqual(merge_class('btn btn-default', 'active btn'), 'btn btn-default active')
+        self.assertEqual(merge_class('a', ['c', 'b'], ('a', 'd')), 'a c b d')
+        self.assertEqual(merge_class('', ''), '')
+
+        h = Bootstrap3Writer()
+        h.bs_glyphicon('star', class_='big glyphicon')
+        h.bs_btn_primary('OK', class_=['btn-lg', 'btn'])
+        self.assertEqual(h.getvalue(root_tag=False),
+                         '<span class="glyphicon glyphicon-star big" aria-hidden="true"></span>'
+                         '<button type="button" class="btn btn-primary btn-lg">OK</button>')
+
+    def test_attribute_handlers(self):
+        handler = PreProcessor.compile_attributes('*, -class, -DATA-*')
+        self.assertEqual(handler({'id': 'a', 'Class': 'b', 'data-x': 1, 'href': '#'}), {'id': 'a', 'href': '#'})
+        self.assertEqual(handler.names, {'id': True, 'Class': False, 'data-x': False, 'href': True})
+        self.assertEqual(pickle.loads(pickle.dumps(handler))({'class': 'b', 'title': 'c'}), {'title': 'c'})
+
+        handler = PreProcessor.compile_attribute_map_class('active, disabled as btn-disabled, open as active')
+        self.assertEqual(handler({'active': True, 'disabled': 1, 'open': True}), {'class': 'active btn-disabled'})
+        self.assertEqual(handler({'active': False}), {})
+        self.assertEqual(PreProcessor.handle_attribute_map_class('a as b', {'a': True}), {'class': 'b'})
+
+    def test_getbuffer(self):
+        h = HTML5Writer(lang='en')
+        with h.body:
+            h.p('hello, world \u2603')
+
+        expected = h.getvalue().encode('utf-8')
+        with h.getbuffer() as view:
+            self.assertEqual(view, expected)
+
+        h.p('again')
+        expected = h.getvalue().encode('utf-8')
+        with h.getbuffer() as view:
+            self.assertEqual(view, expected)
+
+        # size of content doesn't include prologue and epilogue
+        h = HTML5Writer()
+        h.p('hi')
+        self.assertEqual(h.tell(), 9)
+        h.getbuffer().release()
+        self.assertEqual(len(h.buffer), 9)
+
+    def test_file_api(self):
+        with HTML5Writer() as h:
+            self.assertEqual(h.write('<p>'), 3)
+            h.writelines(['a', '</p>'])
+            h.br()
+            self.assertEqual(h.tell(), 12)
+            self.assertEqual(h.getvalue(root_tag=False), '<p>a</p><br>')
+        self.assertTrue(h.closed)
+        with self.assertRaises(ValueError):
+            h.getvalue()
+
+    def test_stream(self):
+        def render(h):
+            with h.body:
+                for i in range(100):
+                    h.p('paragraph %d' % (i, ))
+                    h.br()
+
+        expected = HTML5Writer(lang='en')
+        render(expected)
+
+        chunks = []
+        h = HTML5Writer(lang='en')
+        h.chunk_size = 256
+        with h.stream(chunks.append):
+            render(h)
+
+        self.assertGreater(len(chunks), 3)
+        self.assertTrue(all(len(i) < 512 for i in chunks))
+        self.assertEqual(''.join(chunks), expected.getvalue())
+
+    def test_stream_self_closing(self):
+        chunks = []
+        h = XMLWriter('root')
+        h.chunk_size = 1
+        with h.stream(chunks.append):
+            with h.tag('a'):
+                h.tag('b')
+                h.tag('c', 'x')
+                with h.tag('d'):
+                    h.text('')
+
+        self.assertEqual(''.join(chunks), '<root><a><b/><c>x</c><d/></a></root>')
+
+    def test_profiler(self):
+        profile = Profile()
+        h = Bootstrap3Writer()
+        h.profiler = profile
+        with h.bs_dropdown_menu():
+            for i in range(3):
+                h.bs_menuitem('item', href='/')
+        with h.body:
+            h.br()
+        content = h.getvalue(doctype=False, root_tag=False)
+
+        self.assertEqual(profile.stats[('method', 'bs_menuitem')][0], 3)
+        self.assertEqual(profile.stats[('tag', 'li')][0], 3)
+        self.assertEqual(profile.stats[('method', 'bs_dropdown_menu')][1] + profile.stats[('tag', 'body')][1],
+                         len(content))
+        self.assertEqual(profile.stats[('tag', 'br')][:2], [1, len('<br>')])
+
+        # disabled
+        profile.clear()
+        h = Bootstrap3Writer()
+        h.bs_menuitem('item')
+        h.getvalue()
+        self.assertEqual(profile.stats, {})
+
+    def test_pretty(self):
+        h = HTML5Writer()
+        h.indent = '  '
+        with h.body:
+            with h.div(class_='x'):
+                with h.p:
+                    h.text('hello ')
+                    h.b('world')
+                h.pre('  a\n  b')
+                h.br()
+            with h.ul:
+                h.li('one')
+                h.li()
+
+        self.assertEqual(h.getvalue(), '''<!DOCTYPE html>
+<html>
+  <body>
+    <div class="x">
+      <p>hello <b>world</b></p>
+      <pre>  a
+  b</pre><br></div>
+    <ul>
+      <li>one</li>
+      <li></li>
+    </ul>
+  </body>
+</html>''')
+
+        h = Bootstrap3Writer()
+        h.indent = '  '
+        with h.bs_dropdown_menu():
+            h.bs_menuitem('item', href='/')
+        self.assertEqual(h.getvalue(doctype=False), '''<html>
+  <ul class="dropdown-menu" role="menu">
+    <li role="presentation"><a href="/" role="menuitem" tabindex="-1"> item </a> </li>
+  </ul>
+</html>''')
+
+        # inline-block elements are kept in line
+        h = HTML5Writer()
+        h.indent = '  '
+        with h.form:
+            h.input(name='q')
+            h.button('a')
+            h.button('b')
+        self.assertEqual(h.getvalue(doctype=False), '''<html>
+  <form><input name="q"><button>a</button><button>b</button></form>
+</html>''')
+
+        # pending sibling before `with` block
+        h = HTML5Writer()
+        h.indent = '  '
+        with h.body:
+            h.h1('T')
+            with h.section:
+                h.p('x')
+        self.assertEqual(h.getvalue(doctype=False), '''<html>
+  <body>
+    <h1>T</h1>
+    <section>
+      <p>x</p>
+    </section>
+  </body>
+</html>''')
+
+    def test_minify(self):
+        h = Bootstrap3Writer(lang='en')
+        h.minify = True
+        with h.body:
+            with h.ul(class_='a b'):
+                h.li('one', title='')
+                h.li('two', data_x='/')
+            with h.table:
+                for i in range(2):
+                    with h.tr:
+                        h.td('x')
+                        h.td('y')
+            with h.dl:
+                h.dt('term')
+                h.dd('definition')
+            h.p('one')
+            h.p('two')
+            h.input(type='checkbox', checked=True, hidden=True, disabled='disabled', aria_hidden=True)
+            h.bs_menuitem('item', href='/a?b&c')
+
+        self.assertEqual(h.getvalue(), '<!DOCTYPE html><html lang=en><body>'
+                                       '<ul class="a b"><li title>one<li data-x="/">two</ul>'
+                                       '<table><tr><td>x<td>y<tr><td>x<td>y</table>'
+                                       '<dl><dt>term<dd>definition</dl>'
+                                       '<p>one<p>two</p>'
+                                       '<input type=checkbox checked hidden disabled aria-hidden=true>'
+                                       '<li role=presentation> <a href=/a?b&amp;c role=menuitem tabindex=-1> item </a> '
+                                       '</body></html>')
+
+        # pending sibling before `with` block
+        h = HTML5Writer()
+        h.minify = True
+        with h.table, h.tr:
+            h.td('a')
+            with h.td:
+                h.text('b')
+        self.assertEqual(h.getvalue(root_tag=False), '<table><tr><td>a<td>b</table>')
+
+        # getting value doesn't change the document
+        h = HTML5Writer()
+        h.minify = True
+        with h.body:
+            h.p('x')
+            self.assertEqual(h.getvalue(), '<!DOCTYPE html><html><body><p>x</html>')
+            h.getbuffer().release()
+            h.text('more')
+        self.assertEqual(h.getvalue(), '<!DOCTYPE html><html><body><p>x</p>more</body></html>')
+
+    def test_stream_compress(self):
+        for compress, wbits in (('gzip', 31), ('deflate', 15), ('raw', -15)):
+            chunks = []
+            h = HTML5Writer()
+            h.chunk_size = 64
+            with h.stream(chunks.append, compress=compress):
+                with h.head:
+                    h.title('title')
+                h.flush(sync=True)
+                head = zlib.decompressobj(wbits).decompress(b''.join(chunks)).decode()
+                self.assertTrue(head.endswith('</head>'), head)
+
+                with h.body:
+                    for i in range(100):
+                        h.p('paragraph %d' % (i, ))
+
+            expected = HTML5Writer()
+            with expected.head:
+                expected.title('title')
+            with expected.body:
+                for i in range(100):
+                    expected.p('paragraph %d' % (i, ))
+            self.assertEqual(zlib.decompress(b''.join(chunks), wbits).decode(), expected.getvalue())
+
+    def test_assert_xml_equal(self):
+        self.assertXmlEqual('<html><body class="a b"> text <p>x</p></body></html>',
+                            '<html><body class="b  a">text<p> x </p>\n</body></html>')
+
+        with self.assertRaisesRegex(AssertionError, r"^/html/body\[0\]/p\[1\]/@id: '2' != '3'$"):
+            self.assertXmlEqual('<html><body><p id="1"/><p id="2"/></body></html>',
+                                '<html><body><p id="1"/><p id="3"/></body></html>')
+
+        with self.assertRaisesRegex(AssertionError, r"^/xml/a\[0\]/@class: 'a b' != 'b a'$"):
+            self.assertXmlEqual('<xml><a class="a b"/></xml>', '<xml><a class="b a"/></xml>')
+
+    def test_parse_xml(self):
+        source = '<!DOCTYPE html>\n<html><body title="a &amp; b">x&nbsp;y &lt; &#65;<p>1</p><p>2</p></body></html>'
+
+        for chunk_size in (1, 7, 65536):
+            root = parse_xml(source, chunk_size=chunk_size)
+            self.assertEqual(root[0].text, 'x&nbsp;y < A')
+            self.assertEqual(root[0].attrib, {'title': 'a & b'})
+        self.assertEqual(parse_xml(io.BytesIO(source.encode()), resolve_entities=True)[0].text, 'x\xa0y < A')
+
+        # comment before doctype, BOM, unknown references and references in attribute values
+        for source in ('<!-- c -->\n<!DOCTYPE html><html>a</html>', '\ufeff<!DOCTYPE html><html>a</html>'):
+            self.assertEqual(parse_xml(source).text, 'a')
+            self.assertEqual(parse_xml(source.encode('utf-8'), chunk_size=1).text, 'a')
+        source = '<html title="&times; &unknownent;">&unknownent; &nbsp;</html>'
+        for chunk_size in (1, 7, 65536):
+            root = parse_xml(source, chunk_size=chunk_size)
+            self.assertEqual((root.text, root.attrib), ('&unknownent; &nbsp;', {'title': '&times; &unknownent;'}))
+            root = parse_xml(source.encode('utf-8'), chunk_size=chunk_size, resolve_entities=True)
+            self.assertEqual((root.text, root.attrib), ('&unknownent; \xa0', {'title': '\xd7 &unknownent;'}))
+
+        source = '<!DOCTYPE html>\n<html><body><p>1</p><p>2</p></body></html>'
+        events = iterparse_xml(iter([source[:20], source[20:]]), events=('start', 'end'))
+        self.assertEqual([(event, e.tag) for event, e in events], [
+            ('start', 'html'), ('start', 'body'), ('start', 'p'), ('end', 'p'), ('start', 'p'), ('end', 'p'),
+            ('end', 'body'), ('end', 'html'),
+        ])
+
+    def test_aiter_chunks(self):
+        def render(h):
+            with h.body:
+                for i in range(100):
+                    h.p('paragraph %d' % (i, ))
+
+        expected = HTML5Writer(lang='en')
+        render(expected)
+
+        async def consume(limit=None, executor=None):
+            h = HTML5Writer(lang='en')
+            h.chunk_size = 256
+            result = []
+            async for chunk in h.aiter_chunks(render, executor=executor):
+                result.append(chunk)
+                if len(result) == limit:
+                    break
+            return result
+
+        chunks = asyncio.run(consume())
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual(b''.join(chunks), expected.getvalue().encode('utf-8'))
+
+        # early closing must not block producer
+        self.assertEqual(len(asyncio.run(consume(limit=2))), 2)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(b''.join(asyncio.run(consume(executor=executor))), expected.getvalue().encode('utf-8'))
+
+
+class ListBufferTest(Test):
+
+    def setUp(self):
+        patcher = patch.object(XMLWriter, 'buffer_class', ListBuffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class BytesBufferTest(Test):
+
+    def setUp(self):
+        patcher = patch.object(XMLWriter, 'buffer_class', BytesBuffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)